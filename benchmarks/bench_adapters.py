@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Selecting from the Shakespeare document of the test suite with
+    compiled lxml XPath objects, with the matcher on the lxml tree, and
+    with the matcher on an ``xml.etree.ElementTree`` tree through
+    ``cssselect.adapters.ElementTreeAdapter``.
+
+    Usage: python benchmarks/bench_adapters.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+from xml.etree import ElementTree
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import etree, html
+
+from cssselect import HTMLTranslator
+from cssselect.adapters import ElementTreeAdapter
+from cssselect.compiled import select as xpath_select
+from cssselect.matching import HTMLMatcher
+
+from tests.test_cssselect import HTML_SHAKESPEARE
+
+
+SELECTORS = [
+    'div.dialog',
+    '#speech5',
+    'div:nth-child(2n+1)',
+    'div.scene div.dialog',
+    'div ~ div',
+    'div + div:last-child',
+    '*',
+]
+
+
+def run(number=50):
+    body = html.document_fromstring(HTML_SHAKESPEARE).xpath('//body')[0]
+    et_body = ElementTree.fromstring(etree.tostring(body))
+    translator = HTMLTranslator()
+    matcher = HTMLMatcher()
+    et_matcher = HTMLMatcher(adapter=ElementTreeAdapter(et_body))
+    print('%-24s %10s %10s %10s'
+          % ('selector', 'lxml XPath', 'lxml', 'ElementTree'))
+    for css in SELECTORS:
+        assert ([e.get('id') for e in matcher.select(body, css)] ==
+                [e.get('id') for e in et_matcher.select(et_body, css)])
+        times = [
+            min(timeit.repeat(func, number=number, repeat=3)) / number
+            for func in (lambda: xpath_select(body, css, translator),
+                         lambda: matcher.select(body, css),
+                         lambda: et_matcher.select(et_body, css))]
+        print('%-24s %8.0fus %8.0fus %9.0fus'
+              % ((css,) + tuple(t * 1e6 for t in times)))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Selecting with descendant combinators from a generated page with deep
+    comment threads and wide lists of links, with compiled lxml XPath
+    objects and with the matcher of ``cssselect.matching``, with and
+    without its ancestor Bloom filter.
+
+    Usage: python benchmarks/bench_bloom.py [depth] [width]
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import html
+
+from cssselect import HTMLTranslator
+from cssselect.compiled import select as xpath_select
+from cssselect.matching import HTMLMatcher
+
+
+SELECTORS = [
+    '.sidebar .widget a',
+    '#footer ul li a',
+    'nav > ul > li a',
+    '.comment .comment .author a',
+    'article p span',
+    'div.thread .reply .reply .reply .body',
+]
+
+
+def make_comment(depth, width):
+    if not depth:
+        return ''
+    return ('<div class="comment reply"><p class="author"><a href="#">user</a>'
+            '</p><div class="body"><p>Text <a href="#">link</a></p></div>%s'
+            '</div>' % (make_comment(depth - 1, width) * (2 if depth % 4 == 0
+                                                          else 1)))
+
+
+def make_page(depth, width):
+    links = '<ul>%s</ul>' % ('<li><a href="#">link</a></li>' * width)
+    return ''.join([
+        '<html><body><nav>', links, '</nav>',
+        '<div class="main"><article>',
+        '<p>Some <span>text</span></p>' * width,
+        '<div class="thread">', make_comment(depth, width) * 3, '</div>',
+        '</article></div>',
+        '<div class="sidebar">',
+        '<div class="widget">%s</div>' % links * 3,
+        '<div class="ad">%s</div>' % links,
+        '</div>',
+        '<div id="footer">', links, '</div>',
+        '</body></html>',
+    ])
+
+
+def run(depth=16, width=200, number=5):
+    document = html.document_fromstring(make_page(depth, width))
+    print('%i elements' % sum(1 for _ in document.iter()))
+    translator = HTMLTranslator()
+    matcher = HTMLMatcher()
+    filtered = HTMLMatcher()
+    filtered.ancestor_filter = True
+    print('%-40s %10s %10s %10s'
+          % ('selector', 'lxml XPath', 'matcher', 'filtered'))
+    for css in SELECTORS:
+        expected = xpath_select(document, css, translator)
+        assert matcher.select(document, css) == expected
+        assert filtered.select(document, css) == expected
+        times = [
+            min(timeit.repeat(func, number=number, repeat=3)) / number
+            for func in (lambda: xpath_select(document, css, translator),
+                         lambda: matcher.select(document, css),
+                         lambda: filtered.select(document, css))]
+        print('%-40s %8.1fms %8.1fms %8.1fms'
+              % ((css,) + tuple(t * 1e3 for t in times)))
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Selecting from the Shakespeare document of the test suite:
+    translating and compiling on every call vs. cached compiled XPath.
+
+    Usage: python benchmarks/bench_compiled.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import html
+
+from cssselect import HTMLTranslator
+from cssselect.compiled import select
+
+from tests.test_cssselect import HTML_SHAKESPEARE
+
+
+SELECTORS = [
+    'div.dialog',
+    '#speech5',
+    'div:nth-child(2n+1)',
+    'div[class^=dia]',
+    'div.scene div.dialog',
+    'div#scene1 div.dialog div',
+    ':scope > div',
+]
+
+
+def run(number=500):
+    body = html.document_fromstring(HTML_SHAKESPEARE).xpath('//body')[0]
+    translator = HTMLTranslator()
+
+    def uncached():
+        for css in SELECTORS:
+            body.xpath(translator.css_to_xpath(css))
+
+    def cached():
+        for css in SELECTORS:
+            select(body, css, translator)
+
+    print('%-24s %10s' % ('', 'us/select'))
+    for name, func in [('translate + xpath()', uncached),
+                       ('compiled cache', cached)]:
+        elapsed = min(timeit.repeat(func, number=number, repeat=3))
+        print('%-24s %10.1f' % (
+            name, elapsed / number / len(SELECTORS) * 1e6))
+
+
+if __name__ == '__main__':
+    run()
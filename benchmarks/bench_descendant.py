@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Chains of descendant combinators on deep documents with lxml,
+    translated with ``descendant-or-self::*/`` (the default) or with
+    the ``descendant_axis`` option.
+
+    Usage: python benchmarks/bench_descendant.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import etree
+
+from cssselect import GenericTranslator
+
+
+class DescendantTranslator(GenericTranslator):
+    descendant_axis = True
+
+
+SELECTORS = [
+    'div p',
+    'div div p',
+    'div div div span',
+    'section div.x p span',
+    'div *',
+]
+
+
+def document(depth, width=3):
+    """A tree of nested ``div`` with a ``section`` on top, and a ``p``
+    and a ``span`` in each ``div``."""
+    root = etree.Element('section')
+    parents = [root]
+    for level in range(depth):
+        div = etree.SubElement(parents[-1], 'div')
+        if level % 2:
+            div.set('class', 'x')
+        for i in range(width):
+            etree.SubElement(etree.SubElement(div, 'p'), 'span')
+        parents.append(div)
+    return root
+
+
+def run(depths=(10, 50, 200), number=5):
+    default = GenericTranslator()
+    descendant = DescendantTranslator()
+    print('%-24s %6s %12s %12s' % ('selector', 'depth', 'default',
+                                   'descendant'))
+    for css in SELECTORS:
+        for depth in depths:
+            root = document(depth)
+            before = etree.XPath(default.css_to_xpath(css))
+            after = etree.XPath(descendant.css_to_xpath(css))
+            assert before(root) == after(root), css
+            times = [min(timeit.repeat(lambda: xpath(root),
+                                       number=number, repeat=3)) / number
+                     for xpath in (before, after)]
+            print('%-24s %6i %10.2fms %10.2fms' % (
+                css, depth, times[0] * 1e3, times[1] * 1e3))
+
+
+if __name__ == '__main__':
+    run()
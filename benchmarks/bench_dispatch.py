@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Translation throughput on deep selectors, where most of the time
+    goes into dispatching each parsed object to its ``xpath_*`` method.
+
+    Selectors are parsed once, only :meth:`selector_to_xpath` is timed.
+
+    Usage: python benchmarks/bench_dispatch.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cssselect import parse, HTMLTranslator
+from cssselect.parser import _Node
+
+
+DEEP = {
+    'descendants': ' '.join(['div.a'] * 50),
+    'children': ' > '.join(['li:first-child'] * 50),
+    'siblings': ' ~ '.join(['p[lang|=en]'] * 50),
+    'functions': ' '.join(['tr:nth-child(2n+1)'] * 50),
+    'mixed': ' > '.join(
+        ['ul#nav.menu:not(.hidden) li[data-x^="y"]:last-of-type'] * 10),
+}
+
+
+def count_objects(selector):
+    count = 0
+    stack = [selector.parsed_tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(value for value in node._values()
+                     if isinstance(value, _Node))
+    return count
+
+
+def run(number=200):
+    translator = HTMLTranslator()
+    print('%-12s %8s %14s' % ('selector', 'objects', 'objects/s'))
+    for name, css in sorted(DEEP.items()):
+        selector, = parse(css)
+        objects = count_objects(selector)
+
+        def translate():
+            translator.selector_to_xpath(selector)
+        elapsed = min(timeit.repeat(translate, number=number, repeat=5))
+        print('%-12s %8i %14.0f' % (
+            name, objects, objects * number / elapsed))
+
+
+if __name__ == '__main__':
+    run()
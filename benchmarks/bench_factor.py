@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Evaluation time with lxml of groups of selectors that share everything
+    but their last compound selector, translated to a union of one path
+    per selector (the default) or with the ``factor_groups`` option.
+
+    Usage: python benchmarks/bench_factor.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import html
+
+from cssselect import HTMLTranslator
+
+
+class FactoringTranslator(HTMLTranslator):
+    factor_groups = True
+
+
+def document(count=1000):
+    products = ''.join(
+        '<div class="product"><h2 class="title">%i</h2>'
+        '<span class="price f%i">%i</span><span class="sku">%i</span>'
+        '<p>%s</p></div>' % (i, i % 50, i, i, 'text ' * 5)
+        for i in range(count))
+    return html.fromstring(
+        '<html><body><div id="list">%s</div></body></html>' % products)
+
+
+def groups():
+    yield '.product .title, .product .price, .product .sku'
+    yield 'div, span, h2, p'
+    for size in (10, 50):
+        yield ', '.join('#list > .product .f%i' % i for i in range(size))
+        yield ', '.join('.product > span.f%i' % i for i in range(size))
+
+
+def run(number=5):
+    root = document()
+    default = HTMLTranslator()
+    factoring = FactoringTranslator()
+    print('%-54s %10s %10s' % ('group', 'union', 'factored'))
+    for css in groups():
+        union = default.css_to_xpath(css)
+        factored = factoring.css_to_xpath(css)
+        assert root.xpath(union) == root.xpath(factored), css
+        times = [min(timeit.repeat(lambda: root.xpath(xpath),
+                                   number=number, repeat=3)) / number
+                 for xpath in (union, factored)]
+        if len(css) > 54:
+            css = css[:45] + '... (%i)' % (css.count(',') + 1)
+        print('%-54s %8.2fms %8.2fms' % (css, times[0] * 1e3, times[1] * 1e3))
+
+
+if __name__ == '__main__':
+    run()
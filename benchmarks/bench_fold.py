@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Evaluation time with lxml of XPath expressions translated with and
+    without ``fold_constants``, for selectors with constant conditions.
+
+    Usage: python benchmarks/bench_fold.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import html
+
+from cssselect import HTMLTranslator
+
+
+class FoldingTranslator(HTMLTranslator):
+    fold_constants = True
+
+
+SELECTORS = [
+    'li:not(:hover) a',
+    'a:hover, li.item',
+    'div:focus li > a, ul:visited li',
+    'a[href^=""]',
+]
+
+
+def document(count=2000):
+    items = ''.join(
+        '<li class="item"><a href="/%i">%i</a> <span>x</span></li>' % (i, i)
+        for i in range(count))
+    return html.fromstring(
+        '<html><body><div><ul>%s</ul></div></body></html>' % items)
+
+
+def run(number=20):
+    root = document()
+    default = HTMLTranslator()
+    folding = FoldingTranslator()
+    print('%-34s %10s %10s' % ('selector', 'default', 'folded'))
+    for css in SELECTORS:
+        default_xpath = default.css_to_xpath(css)
+        assert root.xpath(default_xpath) == root.xpath(
+            folding.css_to_xpath(css)), css
+        xpath = ' | '.join(folding.css_to_xpath_list(css))
+
+        def evaluate_default():
+            root.xpath(default_xpath)
+
+        def evaluate_folded():
+            # An empty list means that there is nothing to evaluate
+            if xpath:
+                root.xpath(xpath)
+        times = [min(timeit.repeat(func, number=number, repeat=3)) / number
+                 for func in (evaluate_default, evaluate_folded)]
+        print('%-34s %8.2fms %8.2fms' % (
+            css, times[0] * 1e3, times[1] * 1e3))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Selecting from the Shakespeare document of the test suite with
+    compiled lxml XPath objects, or with the matcher of
+    ``cssselect.matching``, both cached.
+
+    Usage: python benchmarks/bench_matching.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import html
+
+from cssselect import HTMLTranslator
+from cssselect.compiled import select as xpath_select
+from cssselect.matching import HTMLMatcher
+
+from tests.test_cssselect import HTML_SHAKESPEARE
+
+
+SELECTORS = [
+    'div.dialog',
+    '#speech5',
+    'div:nth-child(2n+1)',
+    'div[class^=dia]',
+    'div.scene div.dialog',
+    'div#scene1 div.dialog div',
+    ':scope > div',
+    'div ~ div',
+    'div + div:last-child',
+    '*',
+]
+
+
+def run(number=50):
+    body = html.document_fromstring(HTML_SHAKESPEARE).xpath('//body')[0]
+    translator = HTMLTranslator()
+    matcher = HTMLMatcher()
+    print('%-28s %10s %10s' % ('selector', 'lxml XPath', 'matcher'))
+    for css in SELECTORS:
+        assert xpath_select(body, css, translator) == matcher.select(body, css)
+        times = [
+            min(timeit.repeat(func, number=number, repeat=3)) / number
+            for func in (lambda: xpath_select(body, css, translator),
+                         lambda: matcher.select(body, css))]
+        print('%-28s %8.0fus %8.0fus' % (css, times[0] * 1e6, times[1] * 1e6))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Memory used by parsed selectors, measured with tracemalloc.
+
+    Usage: python benchmarks/bench_memory.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cssselect import parse
+from cssselect.parser import SelectorInterner
+
+from corpus import SELECTORS
+
+
+def filter_list(count):
+    """Distinct selectors in the style of ad-block element hiding rules."""
+    selectors = [css for css in SELECTORS if '::' not in css]
+    return ['%s, .ad-%i' % (selectors[i % len(selectors)], i)
+            for i in range(count)]
+
+
+def measure(source, interner=None):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    parsed = [parse(css) for css in source]
+    if interner is not None:
+        parsed = [[interner.intern(selector) for selector in group]
+                  for group in parsed]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return float(size) / sum(len(group) for group in parsed)
+
+
+def run(count=20000):
+    source = filter_list(count)
+    print('%i selector groups:' % count)
+    print('  %.0f bytes per parsed selector' % measure(source))
+    print('  %.0f bytes per interned selector' % measure(
+        source, SelectorInterner()))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Evaluation time with lxml of the ``name() = 'x'`` comparisons that
+    ``:not()`` and ``+`` used to be translated to, and of the ``self::``
+    node tests that replace them.
+
+    Usage: python benchmarks/bench_name_test.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import etree
+
+from cssselect import GenericTranslator
+
+
+# Selector, and its XPath as translated before ``self::`` node tests
+SELECTORS = [
+    ('li + li',
+     "descendant-or-self::li/following-sibling::*"
+     "[name() = 'li' and (position() = 1)]"),
+    ('li + span',
+     "descendant-or-self::li/following-sibling::*"
+     "[name() = 'span' and (position() = 1)]"),
+    ('ul > :not(li)',
+     "descendant-or-self::ul/*[not(name() = 'li')]"),
+    ('div *:not(span):not(a)',
+     "descendant-or-self::div/descendant-or-self::*/*"
+     "[not(name() = 'span') and (not(name() = 'a'))]"),
+]
+
+
+def document(count=1000):
+    root = etree.Element('div')
+    ul = etree.SubElement(root, 'ul')
+    for i in range(count):
+        li = etree.SubElement(ul, 'li')
+        etree.SubElement(li, 'a').text = str(i)
+        etree.SubElement(ul, 'span' if i % 3 else 'li')
+    return root
+
+
+def run(number=3):
+    root = document()
+    translator = GenericTranslator()
+    print('%-26s %10s %10s' % ('selector', 'name()', 'self::'))
+    for css, before in SELECTORS:
+        old = etree.XPath(before)
+        new = etree.XPath(translator.css_to_xpath(css))
+        assert old(root) == new(root), css
+        times = [min(timeit.repeat(lambda: xpath(root),
+                                   number=number, repeat=3)) / number
+                 for xpath in (old, new)]
+        print('%-26s %8.2fms %8.2fms' % (css, times[0] * 1e3, times[1] * 1e3))
+
+
+if __name__ == '__main__':
+    run()
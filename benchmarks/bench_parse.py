@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Benchmark for :func:`cssselect.parse`, with and without the parse cache.
+
+    Usage: python benchmarks/bench_parse.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cssselect.parser import (parse, set_parse_cache, parse_selector_group,
+                              TokenStream, tokenize)
+
+from corpus import SELECTORS
+
+
+SHAPES = [
+    'div',
+    'div#main',
+    'div.item',
+    'div.a.b',
+    'a[href]',
+    'meta[property="og:title"]',
+    'ul > li',
+    '.a .b',
+    'li:first-child',
+]
+
+
+def run(number=200):
+    def parse_all():
+        for css in SELECTORS:
+            parse(css)
+
+    per_call = len(SELECTORS) * number
+    set_parse_cache(None)
+    cold = min(timeit.repeat(parse_all, number=number, repeat=3)) / per_call
+    cache = set_parse_cache(4096)
+    parse_all()
+    warm = min(timeit.repeat(parse_all, number=number, repeat=3)) / per_call
+    set_parse_cache(None)
+    print('parse() without cache: %8.2f us/call' % (cold * 1e6))
+    print('parse() warm cache:    %8.2f us/call  (%.1fx)' % (
+        warm * 1e6, cold / warm))
+    print(cache)
+
+    def tokenize_and_parse_all():
+        for css in SELECTORS:
+            list(parse_selector_group(TokenStream(tokenize(css))))
+    elapsed = min(timeit.repeat(tokenize_and_parse_all, number=number,
+                                repeat=3))
+    print('tokenize+parse:        %8.0f selectors/s' % (
+        per_call / elapsed))
+
+    print()
+    print('%-28s %10s %10s' % ('shape', 'tokenizer', 'parse()'))
+    for css in SHAPES:
+        slow = min(timeit.repeat(
+            lambda: list(parse_selector_group(TokenStream(tokenize(css)))),
+            number=number * 10, repeat=3)) / number / 10
+        fast = min(timeit.repeat(lambda: parse(css),
+                                 number=number * 10, repeat=3)) / number / 10
+        print('%-28s %8.2fus %8.2fus' % (css, slow * 1e6, fast * 1e6))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Structural pseudo-classes on wide sibling lists with lxml,
+    translated by counting siblings (the default) or with positional
+    predicates. Counting is quadratic in the number of siblings.
+
+    Usage: python benchmarks/bench_positional.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import etree
+
+from cssselect import GenericTranslator
+
+
+class PositionalTranslator(GenericTranslator):
+    positional_predicates = True
+
+
+SELECTORS = [
+    'table > tr:nth-child(2n)',
+    'table > tr:first-child',
+    'table > tr:last-child',
+    'table tr:nth-last-of-type(3)',
+]
+
+
+def table(rows):
+    root = etree.Element('table')
+    for i in range(rows):
+        etree.SubElement(root, 'tr').text = str(i)
+    return root
+
+
+def timed(root, xpath, min_time=0.2):
+    xpath = etree.XPath(xpath)
+    number = 0
+    start = time.time()
+    while True:
+        result = xpath(root)
+        number += 1
+        elapsed = time.time() - start
+        if elapsed > min_time:
+            return elapsed / number, result
+
+
+def run(sizes=(100, 1000, 10000)):
+    default = GenericTranslator()
+    positional = PositionalTranslator()
+    print('%-30s %6s %12s %12s' % ('selector', 'rows', 'count()',
+                                   'positional'))
+    for css in SELECTORS:
+        for rows in sizes:
+            root = table(rows)
+            before, expected = timed(root, default.css_to_xpath(css))
+            after, result = timed(root, positional.css_to_xpath(css))
+            assert result == expected
+            print('%-30s %6i %10.2fms %10.2fms' % (
+                css, rows, before * 1e3, after * 1e3))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Matching from 100 to 100k generated selectors, like the rules of a
+    content blocker, against the Shakespeare document of the test suite:
+    with a ``cssselect.matching.SelectorSet``, with one matcher call per
+    selector, and with a single lxml XPath union of all the selectors.
+    The last two are only timed for the smaller sets.
+
+    Usage: python benchmarks/bench_selector_set.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import etree, html
+
+from cssselect import HTMLTranslator
+from cssselect.matching import HTMLMatcher, SelectorSet
+
+from tests.test_cssselect import HTML_SHAKESPEARE
+
+
+TEMPLATES = [
+    '.ad-%i',
+    '#banner-%i',
+    'div.sponsor-%i > a',
+    '.sidebar .promo-%i',
+    'iframe[src*="tracker%i"]',
+    'a[href^="http://ads%i."]',
+    'div[id^="dialog%i"]',
+    'img.pixel-%i:not(.keep)',
+    '[data-ad-%i]',
+]
+
+
+def make_selectors(count, seed=0):
+    rng = random.Random(seed)
+    selectors = ['div.dialog div', '#speech5', 'div.scene > div:first-child']
+    while len(selectors) < count:
+        selectors.append(rng.choice(TEMPLATES) % rng.randint(0, count))
+    return selectors
+
+
+def timed(func, number=3):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def run():
+    document = html.document_fromstring(HTML_SHAKESPEARE)
+    print('%i elements' % sum(1 for _ in document.iter()))
+    print('%9s %10s %10s %12s %12s' % (
+        'selectors', 'add', 'SelectorSet', 'per selector', 'XPath union'))
+    for count in (100, 1000, 10000, 100000):
+        css_list = make_selectors(count)
+        selector_set = SelectorSet(HTMLMatcher())
+        add_time = timed(
+            lambda: [SelectorSet(HTMLMatcher()).add(css) for css in css_list],
+            number=1)
+        for css in css_list:
+            selector_set.add(css)
+        expected = selector_set.select(document)
+        set_time = timed(lambda: selector_set.select(document))
+
+        per_selector_time = union_time = None
+        if count <= 1000:
+            matcher = HTMLMatcher(cache_size=count)
+
+            def per_selector():
+                found = set()
+                for css in css_list:
+                    found.update(matcher.select(document, css))
+                return [element for element in document.iter()
+                        if element in found]
+            assert per_selector() == expected
+            per_selector_time = timed(per_selector)
+
+            xpath = etree.XPath(
+                HTMLTranslator().css_to_xpath(', '.join(css_list)))
+            assert xpath(document) == expected
+            union_time = timed(lambda: xpath(document))
+        print('%9i %8.0fms %9.1fms %12s %12s' % (
+            count, add_time * 1e3, set_time * 1e3,
+            '-' if per_selector_time is None
+            else '%.1fms' % (per_selector_time * 1e3),
+            '-' if union_time is None else '%.1fms' % (union_time * 1e3)))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Repeated specificity() and canonical() calls, as done when
+    ordering the rules of large stylesheets.
+
+    Usage: python benchmarks/bench_specificity.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cssselect import parse
+from cssselect.parser import specificities
+
+from corpus import SELECTORS
+
+
+def stylesheet(count):
+    selectors = [css for css in SELECTORS
+                 if ',' not in css and '::' not in css]
+    return ['%s .rule-%i' % (selectors[i % len(selectors)], i)
+            for i in range(count)]
+
+
+def run(count=20000, rounds=5):
+    # Mutable selectors (the default) compute each value on every call,
+    # immutable ones only on the first round.
+    for immutable in (False, True):
+        print('parse(css, immutable=%s)' % immutable)
+        selectors = [parse(css, immutable)[0] for css in stylesheet(count)]
+        for name in ('specificity', 'canonical'):
+            for round_ in range(rounds):
+                start = time.time()
+                for selector in selectors:
+                    getattr(selector, name)()
+                if round_ == 0:
+                    print('  %-12s first round:  %6.1f ms' % (
+                        name, (time.time() - start) * 1e3))
+            print('  %-12s later rounds: %6.1f ms' % (
+                name, (time.time() - start) * 1e3))
+
+        selectors = [parse(css, immutable)[0] for css in stylesheet(count)]
+        start = time.time()
+        specificities(selectors)
+        print('  specificities() on a fresh stylesheet: %6.1f ms' % (
+            (time.time() - start) * 1e3))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Selecting from generated XML feeds of growing size with
+    ``cssselect.streaming.iterselect`` over the events of an lxml
+    ``XMLPullParser``, fed by chunks. The peak memory use of the process
+    should not grow with the size of the feed. Building the whole tree
+    and using ``cssselect.compiled`` is shown for comparison, last since
+    it raises the peak.
+
+    Usage: python benchmarks/bench_streaming.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import etree
+
+from cssselect.compiled import select as xpath_select
+from cssselect.streaming import iterselect
+
+
+CSS = 'item.featured > title, item > link[href^="https"]'
+
+
+def make_item(number):
+    return (
+        '<item id="item%i"%s><title>Item %i</title>'
+        '<link href="%s://example.com/%i"/>'
+        '<description>%s</description></item>' % (
+            number, ' class="featured"' if number % 7 == 0 else '',
+            number, 'https' if number % 3 == 0 else 'http', number,
+            'Lorem ipsum dolor sit amet. ' * 10)).encode('ascii')
+
+
+def events(count, chunk=1000):
+    parser = etree.XMLPullParser(events=('start', 'end'))
+    parser.feed(b'<feed>')
+    for start in range(0, count, chunk):
+        parser.feed(b''.join(make_item(number) for number in
+                             range(start, min(start + chunk, count))))
+        for event in parser.read_events():
+            yield event
+    parser.feed(b'</feed>')
+    parser.close()
+    for event in parser.read_events():
+        yield event
+
+
+def max_rss():
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def run():
+    print('%9s %10s %10s %14s' % ('items', 'matches', 'time', 'peak memory'))
+    for count in (10000, 100000, 1000000):
+        start = time.time()
+        matches = 0
+        for element in iterselect(events(count), CSS):
+            matches += 1
+        print('%9i %10i %9.2fs %12.0fMB' % (
+            count, matches, time.time() - start, max_rss()))
+
+    count = 10000
+    start = time.time()
+    document = etree.fromstring(
+        b'<feed>' + b''.join(make_item(number) for number in range(count))
+        + b'</feed>')
+    matches = len(xpath_select(document, CSS))
+    print('%9i %10i %9.2fs %12.0fMB  (whole tree and XPath)' % (
+        count, matches, time.time() - start, max_rss()))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Tokenizer throughput over long selector groups, in tokens per second.
+
+    Usage: python benchmarks/bench_tokenize.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cssselect.parser import tokenize
+
+from corpus import SELECTORS
+
+
+def run(number=50):
+    groups = {
+        'corpus group': ', '.join(SELECTORS),
+        'long group': ', '.join(SELECTORS * 20),
+    }
+    for name, css in sorted(groups.items()):
+        n_tokens = len(list(tokenize(css)))
+        elapsed = min(timeit.repeat(lambda: list(tokenize(css)),
+                                    number=number, repeat=3))
+        print('%-14s %6i tokens  %10.0f tokens/s' % (
+            name, n_tokens, n_tokens * number / elapsed))
+
+    # Each selector of the corpus on its own, as scrapers call it.
+    def tokenize_each():
+        for css in SELECTORS:
+            list(tokenize(css))
+    n_tokens = sum(len(list(tokenize(css))) for css in SELECTORS)
+    elapsed = min(timeit.repeat(tokenize_each, number=number, repeat=3))
+    print('%-14s %6i tokens  %10.0f tokens/s' % (
+        'each selector', n_tokens, n_tokens * number / elapsed))
+
+
+if __name__ == '__main__':
+    run()
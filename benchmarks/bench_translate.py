@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Benchmark for :meth:`GenericTranslator.css_to_xpath`.
+
+    Usage: python benchmarks/bench_translate.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cssselect import GenericTranslator, HTMLTranslator
+
+from corpus import SELECTORS
+
+
+class FullTranslator(HTMLTranslator):
+    """Always goes through parse() and the AST."""
+    def xpath_element(self, selector):
+        return HTMLTranslator.xpath_element(self, selector)
+
+
+def per_call(func, css, number):
+    return min(timeit.repeat(lambda: func(css), number=number,
+                             repeat=3)) / number
+
+
+def run(number=5000):
+    fast = HTMLTranslator().css_to_xpath
+    full = FullTranslator().css_to_xpath
+    print('%-12s %10s %10s' % ('selector', 'full', 'fast path'))
+    for css in ['div', '#content', '.title', 'div#main', 'span.price']:
+        before = per_call(full, css, number)
+        after = per_call(fast, css, number)
+        print('%-12s %8.2fus %8.2fus  (%.1fx)' % (
+            css, before * 1e6, after * 1e6, before / after))
+
+    translator = HTMLTranslator()
+    selectors = [css for css in SELECTORS if '::' not in css]
+
+    def translate_all():
+        for css in selectors:
+            translator.css_to_xpath(css)
+    elapsed = min(timeit.repeat(translate_all, number=number // 50,
+                                repeat=3))
+    print('corpus: %.2f us/selector' % (
+        elapsed / (number // 50) / len(selectors) * 1e6))
+
+
+if __name__ == '__main__':
+    run()
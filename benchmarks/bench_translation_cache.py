@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Benchmark for :meth:`HTMLTranslator.css_to_xpath` with and without
+    the translation cache, on request streams with a given hit rate.
+
+    Popular selectors are drawn from the corpus with a Zipf-like
+    distribution, the rest of the stream is selectors seen only once.
+
+    Usage: python benchmarks/bench_translation_cache.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cssselect import HTMLTranslator, set_translation_cache
+
+from corpus import SELECTORS
+
+
+POPULAR = [css for css in SELECTORS if '::' not in css]
+
+
+def stream(hit_rate, length, seed=0):
+    rng = random.Random(seed)
+    weights = [1.0 / rank for rank in range(1, len(POPULAR) + 1)]
+    total = sum(weights)
+    cumulative = []
+    acc = 0
+    for weight in weights:
+        acc += weight / total
+        cumulative.append(acc)
+    result = []
+    for i in range(length):
+        if rng.random() < hit_rate:
+            x = rng.random()
+            index = next(
+                (j for j, c in enumerate(cumulative) if c >= x),
+                len(POPULAR) - 1)
+            result.append(POPULAR[index])
+        else:
+            result.append('div.unique-%i > a' % i)
+    return result
+
+
+def timed(translator, selectors):
+    start = time.time()
+    for css in selectors:
+        translator.css_to_xpath(css)
+    return time.time() - start
+
+
+def run(length=20000):
+    translator = HTMLTranslator()
+    print('hit rate   no cache    cache     speedup  stats')
+    for hit_rate in (0.5, 0.9, 0.99):
+        selectors = stream(hit_rate, length)
+        set_translation_cache(None)
+        uncached = timed(translator, selectors)
+        cache = set_translation_cache(1024)
+        cached = timed(translator, selectors)
+        set_translation_cache(None)
+        print('%5.0f%%   %7.1f us  %7.1f us   %5.1fx   %s' % (
+            hit_rate * 100, uncached / length * 1e6, cached / length * 1e6,
+            uncached / cached, cache))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Selecting with large groups of selectors with lxml: one union
+    expression in document order, or each selector separately without
+    ordering, with and without removing duplicates.
+
+    Usage: python benchmarks/bench_unordered.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from lxml import html
+
+from cssselect import HTMLTranslator
+from cssselect.compiled import select, select_unordered
+
+
+def document(count=2000):
+    rows = ''.join(
+        '<tr class="r%i"><td class="c%i">%i</td><td><a href="/%i">%i</a>'
+        '</td></tr>' % (i % 20, i % 7, i, i, i)
+        for i in range(count))
+    return html.fromstring(
+        '<html><body><table>%s</table></body></html>' % rows)
+
+
+def groups():
+    for size in (2, 10, 50):
+        yield ', '.join('tr.r%i' % (i % 20) + ' td' * (i // 20 % 2)
+                        for i in range(size))
+    yield ', '.join('.c%i, .c%i a' % (i, i) for i in range(7))
+
+
+def run(number=5):
+    root = document()
+    translator = HTMLTranslator()
+    print('%-6s %10s %10s %10s' % ('size', 'union', 'unordered', 'dedup'))
+    for css in groups():
+        expected = select(root, css, translator)
+        assert set(select_unordered(root, css, translator)) == set(expected)
+        assert len(select_unordered(root, css, translator, dedup=True)) == (
+            len(expected))
+        funcs = [
+            lambda: select(root, css, translator),
+            lambda: select_unordered(root, css, translator),
+            lambda: select_unordered(root, css, translator, dedup=True),
+        ]
+        times = [min(timeit.repeat(func, number=number, repeat=3)) / number
+                 for func in funcs]
+        print('%-6i %8.2fms %8.2fms %8.2fms' % (
+            css.count(',') + 1, times[0] * 1e3, times[1] * 1e3,
+            times[2] * 1e3))
+
+
+if __name__ == '__main__':
+    run()
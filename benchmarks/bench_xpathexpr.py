@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Scaling of the translation with the size of selectors.
+
+    The time per simple selector should stay flat as selectors grow,
+    both for long compound selectors (many conditions on one step)
+    and for long chains of combinators (many steps).
+
+    Usage: python benchmarks/bench_xpathexpr.py
+
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cssselect import parse, GenericTranslator
+
+
+SHAPES = {
+    'compound': lambda n: 'div' + '[data-attribute-name]' * n,
+    'combinators': lambda n: ' > '.join(['div.item'] * n),
+}
+
+
+def run(sizes=(100, 400, 1600, 3200)):
+    translator = GenericTranslator()
+    print('%-12s %6s %16s' % ('shape', 'size', 'us per selector'))
+    for name, shape in sorted(SHAPES.items()):
+        for size in sizes:
+            selector, = parse(shape(size))
+            number = max(1, 20000 // size)
+
+            def translate():
+                translator.selector_to_xpath(selector)
+            elapsed = min(timeit.repeat(translate, number=number, repeat=5))
+            print('%-12s %6i %16.2f' % (
+                name, size, elapsed / number / size * 1e6))
+
+
+if __name__ == '__main__':
+    sys.setrecursionlimit(20000)
+    run()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+    Selectors collected from real-world scraping projects,
+    shared by the benchmark scripts in this directory.
+
+"""
+
+SELECTORS = [
+    'div',
+    'a',
+    'span',
+    'li',
+    'p',
+    'td',
+    'tr',
+    'h1',
+    'img',
+    '#content',
+    '#main',
+    'div#sidebar',
+    '.title',
+    '.price',
+    '.product',
+    'div.item',
+    'span.price',
+    'a.next',
+    'div.a.b',
+    'li.product.featured',
+    'a[href]',
+    'img[src]',
+    'input[type=hidden]',
+    'meta[property="og:title"]',
+    'meta[name="description"]',
+    'link[rel="canonical"]',
+    'a[href^="http"]',
+    'a[href$=".pdf"]',
+    'div[class*="result"]',
+    'ul > li',
+    'ol > li',
+    'table > tbody > tr',
+    'div > p',
+    '.a .b',
+    '.product .title',
+    '.product .price',
+    'div.content p',
+    '#main .article h2',
+    'ul.nav > li > a',
+    'table.data tr td',
+    'h2 + p',
+    'h3 ~ ul',
+    'tr:nth-child(2n)',
+    'li:first-child',
+    'li:last-child',
+    'td:nth-child(3)',
+    'p:not(.ad)',
+    'div:not([hidden])',
+    'a::attr(href)',
+    'span::text',
+    'div.listing > div.item:nth-child(odd) a.title',
+    'form#search input[name="q"]',
+    ':scope > div',
+    'article .byline span.author, article .byline time',
+]
@@ -14,8 +14,12 @@
 """
 
 from cssselect.parser import (parse, Selector, FunctionalPseudoElement,
-                              SelectorError, SelectorSyntaxError)
-from cssselect.xpath import GenericTranslator, HTMLTranslator, ExpressionError
+                              SelectorError, SelectorSyntaxError,
+                              set_parse_cache, get_parse_cache,
+                              SelectorInterner, specificities)
+from cssselect.xpath import (GenericTranslator, HTMLTranslator,
+                             ExpressionError, set_translation_cache,
+                             get_translation_cache)
 
 
 VERSION = '1.1.0'
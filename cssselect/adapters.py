@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+    cssselect.adapters
+    ==================
+
+    Tree adapters give the matchers of :mod:`cssselect.matching` access
+    to the elements of a document tree, whatever library built it.
+
+
+    :copyright: (c) 2007-2012 Ian Bicking and contributors.
+                See AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+
+from operator import attrgetter, methodcaller
+
+
+class TreeAdapter(object):
+    """The protocol for tree adapters.
+
+    Elements are opaque objects for the matchers, which only use these
+    methods. Only elements are passed around: text, comments and
+    processing instructions must be left out of :meth:`children`,
+    :meth:`iter` and the siblings.
+
+    Sub-classes must implement :meth:`tag`, :meth:`parent`,
+    :meth:`children`, :meth:`get`, :meth:`attribute_names` and
+    :meth:`text`. The other methods have default implementations based
+    on these.
+
+    """
+    def tag(self, element):
+        """Return the name of *element*: ``'{uri}local'`` if it is in
+        a namespace, ``'local'`` otherwise."""
+        raise NotImplementedError
+
+    def qualified_name(self, element):
+        """Return the name of *element* as written in the document,
+        like ``'prefix:local'``. Defaults to the local name."""
+        tag = self.tag(element)
+        if tag[:1] == '{':
+            return tag.rsplit('}', 1)[1]
+        return tag
+
+    def parent(self, element):
+        """Return the parent element of *element*, or None."""
+        raise NotImplementedError
+
+    def children(self, element):
+        """Return an iterable of the child elements of *element*."""
+        raise NotImplementedError
+
+    def previous_siblings(self, element):
+        """Return an iterable of the element siblings before *element*,
+        from the closest one."""
+        parent = self.parent(element)
+        if parent is None:
+            return ()
+        siblings = []
+        for sibling in self.children(parent):
+            if sibling is element:
+                break
+            siblings.append(sibling)
+        siblings.reverse()
+        return siblings
+
+    def next_siblings(self, element):
+        """Return an iterable of the element siblings after *element*,
+        from the closest one."""
+        parent = self.parent(element)
+        if parent is None:
+            return ()
+        siblings = iter(self.children(parent))
+        for sibling in siblings:
+            if sibling is element:
+                break
+        return siblings
+
+    def ancestors(self, element):
+        """Iterate over the ancestors of *element*, from its parent."""
+        element = self.parent(element)
+        while element is not None:
+            yield element
+            element = self.parent(element)
+
+    def get(self, element, name):
+        """Return the value of the attribute *name* (``'{uri}local'`` in
+        a namespace) of *element*, or None."""
+        raise NotImplementedError
+
+    def attribute_names(self, element):
+        """Return an iterable of the names of the attributes of *element*,
+        like for :meth:`get`."""
+        raise NotImplementedError
+
+    def text(self, element):
+        """Return the text content of *element* and its descendants, like
+        XPath’s ``string()``."""
+        raise NotImplementedError
+
+    def iter(self, element, tags=('*',)):
+        """Iterate over *element* and its descendants in document order,
+        only the ones with one of the *tags* unless it is ``('*',)``."""
+        stack = [element]
+        while stack:
+            element = stack.pop()
+            if tags == ('*',) or self.tag(element) in tags:
+                yield element
+            children = list(self.children(element))
+            children.reverse()
+            stack.extend(children)
+
+
+class LxmlAdapter(TreeAdapter):
+    """Adapter for lxml trees, used by default."""
+
+    # Call the lxml methods straight from C
+    tag = staticmethod(attrgetter('tag'))
+    parent = staticmethod(methodcaller('getparent'))
+    children = staticmethod(methodcaller('iterchildren', '*'))
+    previous_siblings = staticmethod(
+        methodcaller('itersiblings', '*', preceding=True))
+    next_siblings = staticmethod(methodcaller('itersiblings', '*'))
+    ancestors = staticmethod(methodcaller('iterancestors'))
+
+    @staticmethod
+    def qualified_name(element):
+        tag = element.tag
+        if tag[:1] != '{':
+            return tag
+        local_name = tag.rsplit('}', 1)[1]
+        if element.prefix:
+            return '%s:%s' % (element.prefix, local_name)
+        return local_name
+
+    attribute_names = staticmethod(methodcaller('keys'))
+
+    @staticmethod
+    def get(element, name):
+        return element.get(name)
+
+    @staticmethod
+    def text(element):
+        return ''.join(element.itertext())
+
+    @staticmethod
+    def iter(element, tags=('*',)):
+        return element.iter(*tags)
+
+
+def _is_element(node):
+    # Comments and processing instructions have a function as tag
+    return not callable(node.tag)
+
+
+class ElementTreeAdapter(TreeAdapter):
+    """Adapter for :mod:`xml.etree.ElementTree` trees, and the trees of
+    other libraries with the same API like html5lib.
+
+    ElementTree elements do not know their parent, so the links from
+    each element to its parent are computed in one pass over the tree
+    of *root*, by :meth:`index`. Elements outside of the indexed trees
+    raise :class:`ValueError` rather than having no parent, which would
+    give wrong results.
+
+    """
+    def __init__(self, root):
+        #: Maps each element to its parent and its index in the parent
+        self._links = {}
+        self.index(root)
+
+    def index(self, root):
+        """Compute the links of the elements in the tree of *root*, so
+        that it can be used with this adapter too. Call it again after
+        the tree is modified."""
+        links = self._links
+        # A sub-tree of an indexed tree keeps its parent
+        links.setdefault(root, (None, None))
+        for parent in root.iter():
+            for index, child in enumerate(parent):
+                links[child] = (parent, index)
+
+    def _link(self, element):
+        try:
+            return self._links[element]
+        except KeyError:
+            raise ValueError(
+                '%r is not in a tree indexed by this adapter, '
+                'see ElementTreeAdapter.index()' % (element,))
+
+    tag = staticmethod(attrgetter('tag'))
+
+    def parent(self, element):
+        return self._link(element)[0]
+
+    def children(self, element):
+        return [child for child in element if _is_element(child)]
+
+    def previous_siblings(self, element):
+        parent, index = self._link(element)
+        if parent is None:
+            return ()
+        return [parent[i] for i in range(index - 1, -1, -1)
+                if _is_element(parent[i])]
+
+    def next_siblings(self, element):
+        parent, index = self._link(element)
+        if parent is None:
+            return ()
+        return [sibling for sibling in parent[index + 1:]
+                if _is_element(sibling)]
+
+    attribute_names = staticmethod(methodcaller('keys'))
+
+    @staticmethod
+    def get(element, name):
+        return element.get(name)
+
+    @staticmethod
+    def text(element):
+        return ''.join(element.itertext())
+
+    @staticmethod
+    def iter(element, tags=('*',)):
+        if len(tags) == 1 and tags != ('*',):
+            return element.iter(tags[0])
+        if tags == ('*',):
+            return (node for node in element.iter() if _is_element(node))
+        return (node for node in element.iter() if node.tag in tags)
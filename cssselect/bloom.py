@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+    cssselect.bloom
+    ===============
+
+    A counting Bloom filter of the ancestors of the current element,
+    used to reject selectors early while walking a document.
+
+
+    :copyright: (c) 2007-2012 Ian Bicking and contributors.
+                See AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+
+
+class AncestorFilter(object):
+    """A counting Bloom filter of strings, for the tag names, ids and
+    classes of the ancestors of an element.
+
+    Keys are stored as tuples of positions given by :meth:`positions`,
+    so that they are hashed only once. Positions can be added
+    and removed again as elements are entered and left, in any order.
+
+    :meth:`might_contain` never gives false negatives: when it returns
+    false, one of the keys was never added (or removed since).
+
+    :param bits:
+        The filter has ``2 ** bits`` counters.
+
+    """
+    def __init__(self, bits=12):
+        if not 1 <= bits <= 30:
+            raise ValueError('bits must be between 1 and 30, got %r' % bits)
+        self.bits = bits
+        self._mask = (1 << bits) - 1
+        self._counts = [0] * (1 << bits)
+
+    def positions(self, key):
+        """Return the positions of the counters of *key*."""
+        # Two hash functions from the low and high bits of a single hash
+        hashed = hash(key)
+        return hashed & self._mask, (hashed >> self.bits) & self._mask
+
+    def add(self, positions):
+        """Add keys given by their concatenated *positions*."""
+        counts = self._counts
+        for position in positions:
+            counts[position] += 1
+
+    def remove(self, positions):
+        """Remove keys previously added with the same *positions*."""
+        counts = self._counts
+        for position in positions:
+            counts[position] -= 1
+
+    def might_contain(self, positions):
+        """Whether all the keys given by *positions* might be in the filter.
+        """
+        counts = self._counts
+        for position in positions:
+            if not counts[position]:
+                return False
+        return True
+
+    def __repr__(self):
+        return '<%s %i/%i counters used>' % (
+            self.__class__.__name__,
+            sum(1 for count in self._counts if count), len(self._counts))
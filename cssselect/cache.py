@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+    cssselect.cache
+    ===============
+
+    Size-bounded caches used to memoize parsing and translation.
+
+
+    :copyright: (c) 2007-2012 Ian Bicking and contributors.
+                See AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """A thread-safe mapping that keeps at most *maxsize* entries,
+    evicting the least recently used one when full.
+
+    .. attribute:: hits
+
+        Number of successful lookups.
+
+    .. attribute:: misses
+
+        Number of lookups for a key that was not in the cache.
+
+    .. attribute:: evictions
+
+        Number of entries dropped to make room for new ones.
+
+    """
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1, got %r' % maxsize)
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __repr__(self):
+        return '<%s hits=%i misses=%i evictions=%i size=%i/%i>' % (
+            self.__class__.__name__, self.hits, self.misses,
+            self.evictions, len(self._data), self.maxsize)
+
+    def get(self, key, default=None):
+        """Return the value for *key* and mark it as recently used,
+        or return *default* if it is not cached."""
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store *value* for *key*, evicting the oldest entry if needed."""
+        with self._lock:
+            data = self._data
+            if key in data:
+                del data[key]
+            elif len(data) >= self.maxsize:
+                data.popitem(last=False)
+                self.evictions += 1
+            data[key] = value
+
+    def clear(self):
+        """Drop every entry and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """Return the statistics as a dict."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
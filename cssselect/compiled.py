@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+    cssselect.compiled
+    ==================
+
+    Compiled and cached lxml XPath objects for CSS selectors.
+
+    This module requires lxml, which cssselect itself does not depend on.
+
+
+    :copyright: (c) 2007-2012 Ian Bicking and contributors.
+                See AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+
+import threading
+
+from lxml import etree
+
+from cssselect.cache import LRUCache
+from cssselect.xpath import GenericTranslator
+
+
+class XPathCache(object):
+    """Compiles CSS selectors to :class:`lxml.etree.XPath` objects and keeps
+    the *maxsize* most recently used ones.
+
+    lxml XPath objects must not be shared between threads, so each thread
+    has its own :class:`~cssselect.cache.LRUCache`.
+
+    """
+    def __init__(self, maxsize=256):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1, got %r' % maxsize)
+        self.maxsize = maxsize
+        self._local = threading.local()
+
+    def _cache(self):
+        try:
+            return self._local.cache
+        except AttributeError:
+            cache = self._local.cache = LRUCache(self.maxsize)
+            return cache
+
+    def get(self, css, translator=None, smart_strings=True, namespaces=None):
+        """Return a compiled XPath object for *css*, to be called with
+        an element or a document.
+
+        :param css:
+            A *group of selectors* as an Unicode string.
+        :param translator:
+            The translator instance to use,
+            :class:`~cssselect.GenericTranslator` by default.
+        :param smart_strings:
+            Passed to :class:`lxml.etree.XPath`. ``False`` makes the
+            strings returned for text or attribute nodes (eg. from
+            pseudo-elements of custom translators) plain strings.
+        :param namespaces:
+            A dict of namespace prefixes, passed to :class:`lxml.etree.XPath`.
+        :raises:
+            :class:`~cssselect.SelectorSyntaxError` on invalid selectors,
+            :class:`~cssselect.ExpressionError` on unknown/unsupported
+            selectors.
+
+        """
+        if translator is None:
+            translator = _default_translator
+        key = _key(css, translator, smart_strings, namespaces, False)
+        cache = self._cache()
+        xpath = cache.get(key)
+        if xpath is None:
+            xpath = etree.XPath(translator.css_to_xpath(css),
+                                namespaces=namespaces,
+                                smart_strings=smart_strings)
+            cache.set(key, xpath)
+        return xpath
+
+    def get_list(self, css, translator=None, smart_strings=True,
+                 namespaces=None):
+        """Return a list of compiled XPath objects for *css*, one for each
+        selector that can match some element, as translated by
+        :meth:`~cssselect.GenericTranslator.css_to_xpath_list`.
+
+        Parameters and exceptions are the same as for :meth:`get`.
+
+        """
+        if translator is None:
+            translator = _default_translator
+        key = _key(css, translator, smart_strings, namespaces, True)
+        cache = self._cache()
+        xpaths = cache.get(key)
+        if xpaths is None:
+            xpaths = [etree.XPath(xpath, namespaces=namespaces,
+                                  smart_strings=smart_strings)
+                      for xpath in translator.css_to_xpath_list(css)]
+            cache.set(key, xpaths)
+        return xpaths
+
+    def clear(self):
+        """Drop the compiled objects of the current thread."""
+        self._cache().clear()
+
+    def info(self):
+        """Return the statistics of the current thread's cache as a dict."""
+        return self._cache().info()
+
+
+def _key(css, translator, smart_strings, namespaces, as_list):
+    if namespaces:
+        namespaces = tuple(sorted(namespaces.items()))
+    else:
+        namespaces = None
+    return (css, translator.config_key(), smart_strings, namespaces, as_list)
+
+
+_default_translator = GenericTranslator()
+_default_cache = XPathCache()
+
+
+def compile_xpath(css, translator=None, smart_strings=True, namespaces=None):
+    """Return a compiled XPath object for *css* from a shared
+    :class:`XPathCache`. See :meth:`XPathCache.get`."""
+    return _default_cache.get(css, translator, smart_strings, namespaces)
+
+
+def select(element, css, translator=None, smart_strings=True,
+           namespaces=None):
+    """Return the list of elements in the sub-tree of *element*
+    (including itself) that match *css*, in document order.
+
+    Parameters are the same as for :meth:`XPathCache.get`.
+
+    """
+    return compile_xpath(css, translator, smart_strings, namespaces)(element)
+
+
+def compile_xpath_list(css, translator=None, smart_strings=True,
+                       namespaces=None):
+    """Return a list of compiled XPath objects for *css*, one for each
+    selector, from a shared :class:`XPathCache`.
+    See :meth:`XPathCache.get_list`."""
+    return _default_cache.get_list(css, translator, smart_strings, namespaces)
+
+
+def select_unordered(element, css, translator=None, dedup=False,
+                     smart_strings=True, namespaces=None):
+    """Return the list of elements in the sub-tree of *element*
+    (including itself) that match *css*, in no particular order.
+
+    Each selector of the group is evaluated separately, which saves
+    the XPath engine from merging their results in document order.
+    An element that matches several selectors is in the list as many
+    times, unless *dedup* is true.
+
+    Other parameters are the same as for :meth:`XPathCache.get`.
+
+    """
+    results = []
+    for xpath in compile_xpath_list(css, translator, smart_strings,
+                                    namespaces):
+        results.extend(xpath(element))
+    if not dedup:
+        return results
+    # lxml returns the same proxy object for a node while it is alive,
+    # as it is here, so identity is enough
+    seen = set()
+    unique = []
+    for result in results:
+        if id(result) not in seen:
+            seen.add(id(result))
+            unique.append(result)
+    return unique
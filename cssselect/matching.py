@@ -0,0 +1,1059 @@
+# -*- coding: utf-8 -*-
+"""
+    cssselect.matching
+    ==================
+
+    Match elements against selectors without going through XPath:
+    parsed selectors are compiled to nested Python functions that test
+    an element from right to left, like browsers do.
+
+    Elements are accessed through a tree adapter from
+    :mod:`cssselect.adapters`, for lxml trees by default.
+
+
+    :copyright: (c) 2007-2012 Ian Bicking and contributors.
+                See AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+
+import itertools
+import re
+
+from cssselect.adapters import LxmlAdapter
+from cssselect.bloom import AncestorFilter
+from cssselect.cache import LRUCache
+from cssselect.parser import (parse, parse_series, ascii_lower,
+                              CombinedSelector, Attrib, Class, Hash)
+from cssselect.xpath import (GenericTranslator, ExpressionError,
+                             is_safe_name, is_non_whitespace)
+
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+# Whitespace for the XPath normalize-space() function
+split_whitespace = re.compile('[ \t\r\n]+').split
+
+
+_lxml_adapter = LxmlAdapter()
+
+
+def _never(element, scope):
+    return False
+
+
+def _always(element, scope):
+    return True
+
+
+def _first(iterable):
+    for item in iterable:
+        return item
+
+
+def _has_ancestor(adapter, element, tag, attribute):
+    """Whether an ancestor of *element* has this *tag* and *attribute*."""
+    for ancestor in adapter.ancestors(element):
+        if (adapter.tag(ancestor) == tag and
+                adapter.get(ancestor, attribute) is not None):
+            return True
+    return False
+
+
+def _nth(a, b, position):
+    """Whether *position* (from 1) is an+b for some n >= 0."""
+    if a == 0:
+        return position == b
+    n, remainder = divmod(position - b, a)
+    return remainder == 0 and n >= 0
+
+
+def _universal(node):
+    """The element node at the start of a compound selector."""
+    while not hasattr(node, 'element'):
+        node = node.selector
+    return node
+
+
+class GenericMatcher(object):
+    """
+    Matcher for "generic" XML documents, with the same behavior as
+    :class:`~cssselect.GenericTranslator`.
+
+    :param namespaces:
+        A dict of the namespace prefixes used in selectors.
+    :param adapter:
+        A :class:`~cssselect.adapters.TreeAdapter` for the documents,
+        :class:`~cssselect.adapters.LxmlAdapter` by default.
+
+    """
+
+    combinator_mapping = GenericTranslator.combinator_mapping
+    attribute_operator_mapping = GenericTranslator.attribute_operator_mapping
+
+    #: See :attr:`GenericTranslator.id_attribute`.
+    id_attribute = 'id'
+
+    #: See :attr:`GenericTranslator.lang_attribute`.
+    lang_attribute = 'xml:lang'
+
+    #: See :attr:`GenericTranslator.lower_case_element_names`.
+    lower_case_element_names = False
+    lower_case_attribute_names = False
+    lower_case_attribute_values = False
+
+    #: If true, :meth:`select` keeps a counting Bloom filter of the tag
+    #: names, ids and classes of the ancestors while walking the document,
+    #: and rejects elements without the ancestors required by descendant
+    #: and child combinators before climbing up the tree.
+    ancestor_filter = False
+
+    def __init__(self, namespaces=None, cache_size=256, adapter=None):
+        self.namespaces = dict(namespaces or {})
+        self.adapter = adapter or _lxml_adapter
+        self._cache = LRUCache(cache_size)
+
+    def compile(self, css):
+        """Compile a *group of selectors*.
+
+        :param css:
+            A *group of selectors* as an Unicode string.
+        :raises:
+            :class:`~cssselect.SelectorSyntaxError` on invalid selectors,
+            :class:`~cssselect.ExpressionError` on unknown/unsupported
+            selectors, including pseudo-elements.
+        :returns:
+            A function ``match(element, scope=None)`` that returns whether
+            *element* matches any of the selectors. Elements outside of
+            the sub-tree of *scope* (the element that ``:scope`` matches)
+            are not considered when matching combinators.
+            With no *scope*, ``:scope`` is the root element.
+
+        """
+        match = self._cache.get(css)
+        if match is None:
+            selectors = parse(css)
+            compiled = [(self.compile_selector(selector), selector)
+                        for selector in selectors]
+            compiled = [(function, selector) for function, selector
+                        in compiled if function is not _never]
+            functions = [function for function, _ in compiled]
+            if not functions:
+                function = _never
+            elif len(functions) == 1:
+                function, = functions
+            else:
+                def function(element, scope):
+                    for selector_function in functions:
+                        if selector_function(element, scope):
+                            return True
+                    return False
+
+            def match(element, scope=None):
+                return function(element, scope)
+            match.function = function
+            # Tags of the only elements that can match, or ('*',)
+            tags = set(self._subject_tag(selector) for selector in selectors)
+            match.tags = ('*',) if None in tags else tuple(tags)
+            # Keys of the required ancestors, for each selector
+            match.ancestor_keys = [
+                (self._ancestor_keys(selector), function)
+                for function, selector in compiled]
+            self._cache.set(css, match)
+        return match
+
+    def compile_selector(self, selector):
+        """Compile a parsed :class:`~cssselect.Selector` object to
+        a function taking an element and the scope element."""
+        if selector.pseudo_element:
+            raise ExpressionError('Pseudo-elements are not supported.')
+        return self.match(selector.parsed_tree)
+
+    def select(self, root, css):
+        """Return the list of elements in the sub-tree of *root*
+        (including itself) that match *css*, in document order."""
+        match = self.compile(css)
+        function = match.function
+        if function is _never:
+            return []
+        if self.ancestor_filter:
+            return self._select_filtered(root, match)
+        return [element for element in self.adapter.iter(root, match.tags)
+                if function(element, root)]
+
+    def _select_filtered(self, root, match):
+        """Walk the sub-tree of *root* once, keeping the ancestors of
+        the current element in an :class:`~cssselect.bloom.AncestorFilter`.
+        """
+        adapter = self.adapter
+        tag_of = adapter.tag
+        get = adapter.get
+        children = adapter.children
+        id_attribute = self.id_attribute
+        ancestors = AncestorFilter()
+        key_positions = ancestors.positions
+        might_contain = ancestors.might_contain
+        selectors = [
+            (tuple(position
+                   for key in keys for position in key_positions(key)),
+             function)
+            for keys, function in match.ancestor_keys]
+        tags = None if match.tags == ('*',) else frozenset(match.tags)
+        # Only the keys required by a selector are worth adding
+        required_keys = set(
+            key for keys, _ in match.ancestor_keys for key in keys)
+        any_id = any(key[:1] == '#' for key in required_keys)
+        any_class = any(key[:1] == '.' for key in required_keys)
+
+        def element_positions(element):
+            result = ()
+            tag = tag_of(element)
+            if tag in required_keys:
+                result += key_positions(tag)
+            if any_id:
+                element_id = get(element, id_attribute)
+                if element_id is not None:
+                    key = '#' + element_id
+                    if key in required_keys:
+                        result += key_positions(key)
+            if any_class:
+                classes = get(element, 'class')
+                if classes:
+                    for class_name in split_whitespace(classes):
+                        key = '.' + class_name
+                        if key in required_keys:
+                            result += key_positions(key)
+            return result
+
+        results = []
+        # For each level of the walk: the iterator over the children of
+        # an element, the element, and the positions of its keys once
+        # they are added to the filter, when its first child is visited.
+        iterators = [iter((root,))]
+        parents = [None]
+        added = [None]
+        while iterators:
+            for element in iterators[-1]:
+                if added[-1] is None and parents[-1] is not None:
+                    added[-1] = element_positions(parents[-1])
+                    ancestors.add(added[-1])
+                if tags is None or tag_of(element) in tags:
+                    for positions, function in selectors:
+                        if (might_contain(positions) and
+                                function(element, root)):
+                            results.append(element)
+                            break
+                iterators.append(iter(children(element)))
+                parents.append(element)
+                added.append(None)
+                break
+            else:
+                iterators.pop()
+                parents.pop()
+                element_added = added.pop()
+                if element_added is not None:
+                    ancestors.remove(element_added)
+        return results
+
+    def match(self, parsed_selector):
+        """Compile any parsed selector object."""
+        type_name = type(parsed_selector).__name__
+        method = getattr(self, 'match_%s' % type_name.lower(), None)
+        if method is None:
+            raise ExpressionError('%s is not supported.' % type_name)
+        return method(parsed_selector)
+
+    def _subject_tag(self, selector):
+        """The tag of the elements that *selector* can match, or None."""
+        tree = selector.parsed_tree
+        while isinstance(tree, CombinedSelector):
+            tree = tree.subselector
+        return self._tag(_universal(tree))
+
+    def _ancestor_keys(self, selector):
+        """The tag names, ids (``'#id'``) and classes (``'.class'``) that
+        are required on the ancestors of elements matching *selector*."""
+        keys = []
+        tree = selector.parsed_tree
+        while isinstance(tree, CombinedSelector):
+            left = tree.selector
+            # A compound on the left of a descendant or child combinator
+            # matches an ancestor, even after sibling combinators.
+            if tree.combinator in (' ', '>'):
+                node = left
+                if isinstance(node, CombinedSelector):
+                    node = node.subselector
+                # Only look at the main part of :not(), :nth-child(), etc.
+                while not hasattr(node, 'element'):
+                    if isinstance(node, Class):
+                        keys.append('.' + node.class_name)
+                    elif isinstance(node, Hash):
+                        keys.append('#' + node.id)
+                    node = node.selector
+                tag = self._tag(node)
+                if tag is not None:
+                    keys.append(tag)
+            tree = left
+        return keys
+
+    def _namespace_uri(self, prefix):
+        try:
+            return self.namespaces[prefix]
+        except KeyError:
+            raise ExpressionError('Undefined namespace prefix %r' % prefix)
+
+    def _attribute_name(self, attrib_selector):
+        """The name of the attribute of an attribute selector, as given
+        to the adapter's ``get()``."""
+        if self.lower_case_attribute_names:
+            name = attrib_selector.attrib.lower()
+        else:
+            name = attrib_selector.attrib
+        if attrib_selector.namespace:
+            uri = self._namespace_uri(attrib_selector.namespace)
+            if uri:
+                name = '{%s}%s' % (uri, name)
+        return name
+
+    def _tag(self, element_selector):
+        """The tag of elements matching a type selector, or None for
+        a universal or unsafe one."""
+        name = element_selector.element
+        if not name or not is_safe_name(name):
+            return None
+        if self.lower_case_element_names:
+            name = name.lower()
+        if element_selector.namespace:
+            if not is_safe_name(element_selector.namespace):
+                return None
+            uri = self._namespace_uri(element_selector.namespace)
+            return '{%s}%s' % (uri, name) if uri else name
+        return name
+
+
+    # Dispatched by parsed object type
+
+    def match_combinedselector(self, combined):
+        """Compile a combined selector."""
+        combinator = self.combinator_mapping[combined.combinator]
+        method = getattr(self, 'match_%s_combinator' % combinator)
+        left = self.match(combined.selector)
+        right = self.match(combined.subselector)
+        if left is _never or right is _never:
+            return _never
+        return method(left, right)
+
+    def match_negation(self, negation):
+        inner = self.match(negation.selector)
+        sub = self.match(negation.subselector)
+        if sub is _always:
+            return _never
+        if sub is _never:
+            return inner
+
+        def match(element, scope):
+            return inner(element, scope) and not sub(element, scope)
+        return match
+
+    def match_function(self, function):
+        """Compile a functional pseudo-class."""
+        method = getattr(
+            self, 'match_%s_function' % function.name.replace('-', '_'),
+            None)
+        if method is None:
+            raise ExpressionError(
+                "The pseudo-class :%s() is unknown" % function.name)
+        return method(self.match(function.selector), function)
+
+    def match_pseudo(self, pseudo):
+        """Compile a pseudo-class."""
+        method = getattr(
+            self, 'match_%s_pseudo' % pseudo.ident.replace('-', '_'), None)
+        if method is None:
+            raise ExpressionError(
+                "The pseudo-class :%s is unknown" % pseudo.ident)
+        return method(self.match(pseudo.selector), pseudo)
+
+    def match_attrib(self, selector):
+        """Compile an attribute selector."""
+        operator = self.attribute_operator_mapping[selector.operator]
+        method = getattr(self, 'match_attrib_%s' % operator)
+        name = self._attribute_name(selector)
+        if selector.value is None:
+            value = None
+        elif self.lower_case_attribute_values:
+            value = selector.value.value.lower()
+        else:
+            value = selector.value.value
+        return method(self.match(selector.selector), name, value)
+
+    def match_class(self, class_selector):
+        """Compile a class selector."""
+        return self.match_attrib_includes(
+            self.match(class_selector.selector), 'class',
+            class_selector.class_name)
+
+    def match_hash(self, id_selector):
+        """Compile an ID selector."""
+        return self.match_attrib_equals(
+            self.match(id_selector.selector), self.id_attribute,
+            id_selector.id)
+
+    def match_element(self, selector):
+        """Compile a type or universal selector."""
+        tag_of = self.adapter.tag
+        tag = self._tag(selector)
+        if tag is not None:
+            def match(element, scope):
+                return tag_of(element) == tag
+            return match
+        name = selector.element
+        if name:
+            # Compare names like XPath’s name() in GenericTranslator
+            if self.lower_case_element_names:
+                name = name.lower()
+            if selector.namespace:
+                name = '%s:%s' % (selector.namespace, name)
+            qualified_name = self.adapter.qualified_name
+
+            def match(element, scope):
+                return qualified_name(element) == name
+            return match
+        if selector.namespace:
+            uri = self._namespace_uri(selector.namespace)
+            start = '{%s}' % uri
+
+            def match(element, scope):
+                return tag_of(element).startswith(start)
+            return match
+        return _always
+
+
+    # CombinedSelector: dispatch by combinator
+
+    def match_descendant_combinator(self, left, right):
+        """right is a child, grand-child or further descendant of left"""
+        parent = self.adapter.parent
+
+        def match(element, scope):
+            if not right(element, scope):
+                return False
+            while element is not scope:
+                element = parent(element)
+                if element is None:
+                    return False
+                if left(element, scope):
+                    return True
+            return False
+        return match
+
+    def match_child_combinator(self, left, right):
+        """right is an immediate child of left"""
+        get_parent = self.adapter.parent
+
+        def match(element, scope):
+            if element is scope or not right(element, scope):
+                return False
+            parent = get_parent(element)
+            return parent is not None and left(parent, scope)
+        return match
+
+    def match_direct_adjacent_combinator(self, left, right):
+        """right is a sibling immediately after left"""
+        previous_siblings = self.adapter.previous_siblings
+
+        def match(element, scope):
+            if element is scope or not right(element, scope):
+                return False
+            previous = _first(previous_siblings(element))
+            return previous is not None and left(previous, scope)
+        return match
+
+    def match_indirect_adjacent_combinator(self, left, right):
+        """right is a sibling after left, immediately or not"""
+        previous_siblings = self.adapter.previous_siblings
+
+        def match(element, scope):
+            if element is scope or not right(element, scope):
+                return False
+            for sibling in previous_siblings(element):
+                if left(sibling, scope):
+                    return True
+            return False
+        return match
+
+
+    # Function: dispatch by function/pseudo-class name
+
+    def match_nth_child_function(self, inner, function, last=False,
+                                 of_type=False):
+        try:
+            a, b = parse_series(function.arguments)
+        except ValueError:
+            raise ExpressionError("Invalid series: '%r'" % function.arguments)
+        if a == 1 and b <= 1:
+            return inner
+        if a < 0 and b < 1:
+            return _never
+        if last:
+            siblings = self.adapter.next_siblings
+        else:
+            siblings = self.adapter.previous_siblings
+        tag_of = self.adapter.tag
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            position = 1
+            if of_type:
+                tag = tag_of(element)
+                for sibling in siblings(element):
+                    if tag_of(sibling) == tag:
+                        position += 1
+            else:
+                for sibling in siblings(element):
+                    position += 1
+            return _nth(a, b, position)
+        return match
+
+    def match_nth_last_child_function(self, inner, function):
+        return self.match_nth_child_function(inner, function, last=True)
+
+    def match_nth_of_type_function(self, inner, function):
+        if self._tag(_universal(function.selector)) is None:
+            raise ExpressionError(
+                "*:nth-of-type() is not implemented")
+        return self.match_nth_child_function(inner, function, of_type=True)
+
+    def match_nth_last_of_type_function(self, inner, function):
+        if self._tag(_universal(function.selector)) is None:
+            raise ExpressionError(
+                "*:nth-of-type() is not implemented")
+        return self.match_nth_child_function(inner, function, last=True,
+                                             of_type=True)
+
+    def match_contains_function(self, inner, function):
+        if function.argument_types() not in (['STRING'], ['IDENT']):
+            raise ExpressionError(
+                "Expected a single string or ident for :contains(), got %r"
+                % function.arguments)
+        value = function.arguments[0].value
+        text = self.adapter.text
+
+        def match(element, scope):
+            return inner(element, scope) and value in text(element)
+        return match
+
+    def match_lang_function(self, inner, function):
+        if function.argument_types() not in (['STRING'], ['IDENT']):
+            raise ExpressionError(
+                "Expected a single string or ident for :lang(), got %r"
+                % function.arguments)
+        value = function.arguments[0].value.lower()
+        prefix = value + '-'
+        adapter = self.adapter
+
+        # Like XPath’s lang()
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            lang = adapter.get(element, XML_LANG)
+            if lang is None:
+                for ancestor in adapter.ancestors(element):
+                    lang = adapter.get(ancestor, XML_LANG)
+                    if lang is not None:
+                        break
+                else:
+                    return False
+            lang = lang.lower()
+            return lang == value or lang.startswith(prefix)
+        return match
+
+
+    # Pseudo: dispatch by pseudo-class name
+
+    def match_root_pseudo(self, inner, pseudo):
+        parent = self.adapter.parent
+
+        def match(element, scope):
+            return inner(element, scope) and parent(element) is None
+        return match
+
+    def match_scope_pseudo(self, inner, pseudo):
+        parent = self.adapter.parent
+
+        def match(element, scope):
+            if scope is None:
+                return inner(element, scope) and parent(element) is None
+            return element is scope and inner(element, scope)
+        return match
+
+    def match_first_child_pseudo(self, inner, pseudo):
+        previous_siblings = self.adapter.previous_siblings
+
+        def match(element, scope):
+            return (inner(element, scope) and
+                    _first(previous_siblings(element)) is None)
+        return match
+
+    def match_last_child_pseudo(self, inner, pseudo):
+        next_siblings = self.adapter.next_siblings
+
+        def match(element, scope):
+            return (inner(element, scope) and
+                    _first(next_siblings(element)) is None)
+        return match
+
+    def match_first_of_type_pseudo(self, inner, pseudo):
+        if self._tag(_universal(pseudo.selector)) is None:
+            raise ExpressionError(
+                "*:first-of-type is not implemented")
+        return self._of_type(inner, first=True, last=False)
+
+    def match_last_of_type_pseudo(self, inner, pseudo):
+        if self._tag(_universal(pseudo.selector)) is None:
+            raise ExpressionError(
+                "*:last-of-type is not implemented")
+        return self._of_type(inner, first=False, last=True)
+
+    def match_only_child_pseudo(self, inner, pseudo):
+        adapter = self.adapter
+
+        def match(element, scope):
+            return (inner(element, scope) and
+                    adapter.parent(element) is not None and
+                    _first(adapter.previous_siblings(element)) is None and
+                    _first(adapter.next_siblings(element)) is None)
+        return match
+
+    def match_only_of_type_pseudo(self, inner, pseudo):
+        if self._tag(_universal(pseudo.selector)) is None:
+            raise ExpressionError(
+                "*:only-of-type is not implemented")
+        return self._of_type(inner, first=True, last=True)
+
+    def _of_type(self, inner, first, last):
+        adapter = self.adapter
+        tag_of = adapter.tag
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            tag = tag_of(element)
+            if first:
+                for sibling in adapter.previous_siblings(element):
+                    if tag_of(sibling) == tag:
+                        return False
+            if last:
+                for sibling in adapter.next_siblings(element):
+                    if tag_of(sibling) == tag:
+                        return False
+            if first and last:
+                # count(parent::*/child::e) = 1
+                return adapter.parent(element) is not None
+            return True
+        return match
+
+    def match_empty_pseudo(self, inner, pseudo):
+        adapter = self.adapter
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            if _first(adapter.children(element)) is not None:
+                return False
+            return not adapter.text(element)
+        return match
+
+    def pseudo_never_matches(self, inner, pseudo):
+        """Common implementation for pseudo-classes that never match."""
+        return _never
+
+    match_link_pseudo = pseudo_never_matches
+    match_visited_pseudo = pseudo_never_matches
+    match_hover_pseudo = pseudo_never_matches
+    match_active_pseudo = pseudo_never_matches
+    match_focus_pseudo = pseudo_never_matches
+    match_target_pseudo = pseudo_never_matches
+    match_enabled_pseudo = pseudo_never_matches
+    match_disabled_pseudo = pseudo_never_matches
+    match_checked_pseudo = pseudo_never_matches
+
+    # Attrib: dispatch by attribute operator
+
+    def match_attrib_exists(self, inner, name, value):
+        assert not value
+        get = self.adapter.get
+
+        def match(element, scope):
+            return inner(element, scope) and get(element, name) is not None
+        return match
+
+    def match_attrib_equals(self, inner, name, value):
+        get = self.adapter.get
+
+        def match(element, scope):
+            return inner(element, scope) and get(element, name) == value
+        return match
+
+    def match_attrib_different(self, inner, name, value):
+        get = self.adapter.get
+        if value:
+            def match(element, scope):
+                return inner(element, scope) and get(element, name) != value
+        else:
+            def match(element, scope):
+                return inner(element, scope) and bool(get(element, name))
+        return match
+
+    def match_attrib_includes(self, inner, name, value):
+        if not is_non_whitespace(value):
+            return _never
+        get = self.adapter.get
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            attribute = get(element, name)
+            return (attribute is not None and
+                    value in split_whitespace(attribute))
+        return match
+
+    def match_attrib_dashmatch(self, inner, name, value):
+        get = self.adapter.get
+        prefix = value + '-'
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            attribute = get(element, name)
+            return attribute is not None and (
+                attribute == value or attribute.startswith(prefix))
+        return match
+
+    def match_attrib_prefixmatch(self, inner, name, value):
+        if not value:
+            return _never
+        get = self.adapter.get
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            attribute = get(element, name)
+            return attribute is not None and attribute.startswith(value)
+        return match
+
+    def match_attrib_suffixmatch(self, inner, name, value):
+        if not value:
+            return _never
+        get = self.adapter.get
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            attribute = get(element, name)
+            return attribute is not None and attribute.endswith(value)
+        return match
+
+    def match_attrib_substringmatch(self, inner, name, value):
+        if not value:
+            return _never
+        get = self.adapter.get
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            attribute = get(element, name)
+            return attribute is not None and value in attribute
+        return match
+
+
+def _form_control(adapter, element, name):
+    # (name(.) = 'input' and @type != 'hidden') or name(.) = 'button' or ...
+    if name == 'input':
+        input_type = adapter.get(element, 'type')
+        return input_type is not None and input_type != 'hidden'
+    return name in ('button', 'select', 'textarea')
+
+
+class HTMLMatcher(GenericMatcher):
+    """
+    Matcher for (X)HTML documents, with the same behavior as
+    :class:`~cssselect.HTMLTranslator`.
+
+    :param xhtml:
+        If false (the default), element names and attribute names
+        are case-insensitive.
+
+    """
+
+    lang_attribute = 'lang'
+
+    def __init__(self, xhtml=False, namespaces=None, cache_size=256,
+                 adapter=None):
+        super(HTMLMatcher, self).__init__(namespaces, cache_size, adapter)
+        self.xhtml = xhtml
+        if not xhtml:
+            self.lower_case_element_names = True
+            self.lower_case_attribute_names = True
+
+    def match_checked_pseudo(self, inner, pseudo):
+        adapter = self.adapter
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            name = adapter.qualified_name(element)
+            if (adapter.get(element, 'selected') is not None and
+                    name == 'option'):
+                return True
+            return (adapter.get(element, 'checked') is not None and
+                    name in ('input', 'command') and
+                    adapter.get(element, 'type') in ('checkbox', 'radio'))
+        return match
+
+    def match_lang_function(self, inner, function):
+        if function.argument_types() not in (['STRING'], ['IDENT']):
+            raise ExpressionError(
+                "Expected a single string or ident for :lang(), got %r"
+                % function.arguments)
+        prefix = function.arguments[0].value.lower() + '-'
+        lang_attribute = self.lang_attribute
+        adapter = self.adapter
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            lang = adapter.get(element, lang_attribute)
+            if lang is None:
+                for ancestor in adapter.ancestors(element):
+                    lang = adapter.get(ancestor, lang_attribute)
+                    if lang is not None:
+                        break
+                else:
+                    return False
+            return (ascii_lower(lang) + '-').startswith(prefix)
+        return match
+
+    def match_link_pseudo(self, inner, pseudo):
+        adapter = self.adapter
+
+        def match(element, scope):
+            return (inner(element, scope) and
+                    adapter.get(element, 'href') is not None and
+                    adapter.qualified_name(element) in ('a', 'link', 'area'))
+        return match
+
+    def match_disabled_pseudo(self, inner, pseudo):
+        adapter = self.adapter
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            name = adapter.qualified_name(element)
+            form_control = _form_control(adapter, element, name)
+            if adapter.get(element, 'disabled') is not None and (
+                    form_control or name in ('command', 'fieldset',
+                                             'optgroup', 'option')):
+                return True
+            return form_control and _has_ancestor(
+                adapter, element, 'fieldset', 'disabled')
+        return match
+
+    def match_enabled_pseudo(self, inner, pseudo):
+        adapter = self.adapter
+
+        def match(element, scope):
+            if not inner(element, scope):
+                return False
+            name = adapter.qualified_name(element)
+            disabled = adapter.get(element, 'disabled') is not None
+            if name in ('a', 'link', 'area'):
+                if adapter.get(element, 'href') is not None:
+                    return True
+            elif name in ('command', 'fieldset', 'optgroup'):
+                return not disabled
+            elif name == 'option':
+                return not disabled and not _has_ancestor(
+                    adapter, element, 'optgroup', 'disabled')
+            if _form_control(adapter, element, name) or name == 'keygen':
+                return not disabled and not _has_ancestor(
+                    adapter, element, 'fieldset', 'disabled')
+            return False
+        return match
+
+
+class SelectorSet(object):
+    """A set of selectors, indexed to find quickly the ones that match
+    an element.
+
+    Like the rule hash of browsers, each selector is put in a bucket for
+    an id, a class, a tag or an attribute name required by its rightmost
+    compound selector, or with the selectors that require none of these.
+    An element is then only tested against the selectors in the buckets
+    of its own id, classes, tag and attributes.
+
+    :param matcher:
+        The :class:`GenericMatcher` or :class:`HTMLMatcher` used to compile
+        selectors, a new :class:`GenericMatcher` by default.
+
+    """
+    def __init__(self, matcher=None):
+        self.matcher = matcher or GenericMatcher()
+        self._ids = {}
+        self._classes = {}
+        self._tags = {}
+        self._attributes = {}
+        self._universal = {}
+        #: Maps each selector to its bucket dict, key and entry
+        self._entries = {}
+        self._count = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, selector):
+        """Whether *selector*, an immutable :class:`~cssselect.Selector`,
+        is in the set."""
+        return selector in self._entries
+
+    def __iter__(self):
+        """Iterate over the :class:`~cssselect.Selector` objects,
+        in the order they were added."""
+        entries = sorted(entry for _, _, entry in self._entries.values())
+        return (selector for _, selector, _ in entries)
+
+    def add(self, css):
+        """Add the selectors of a *group of selectors*.
+        Selectors already in the set are ignored.
+
+        :raises:
+            :class:`~cssselect.SelectorSyntaxError` on invalid selectors,
+            :class:`~cssselect.ExpressionError` on unknown/unsupported
+            selectors. In both cases, no selector is added.
+
+        """
+        compiled = [(selector, self.matcher.compile_selector(selector))
+                    for selector in parse(css, immutable=True)]
+        for selector, function in compiled:
+            if selector in self._entries:
+                continue
+            entry = (next(self._count), selector, function)
+            if function is _never:
+                buckets, key = None, None
+            else:
+                buckets, key = self._bucket(selector)
+                buckets.setdefault(key, []).append(entry)
+            self._entries[selector] = buckets, key, entry
+
+    def remove(self, css):
+        """Remove the selectors of a *group of selectors*.
+
+        :raises:
+            :class:`KeyError` if one of the selectors is not in the set.
+            In that case, no selector is removed.
+
+        """
+        selectors = parse(css, immutable=True)
+        for selector in selectors:
+            if selector not in self._entries:
+                raise KeyError(selector)
+        for selector in selectors:
+            # The same selector may appear twice in a group
+            if selector not in self._entries:
+                continue
+            buckets, key, entry = self._entries.pop(selector)
+            if buckets is not None:
+                bucket = buckets[key]
+                bucket.remove(entry)
+                if not bucket:
+                    del buckets[key]
+
+    def _bucket(self, selector):
+        """The buckets dict and key for *selector*."""
+        tree = selector.parsed_tree
+        while isinstance(tree, CombinedSelector):
+            tree = tree.subselector
+        id_ = class_name = attribute = None
+        # Only look at the main part of :not(), :nth-child(), etc.
+        node = tree
+        while not hasattr(node, 'element'):
+            if isinstance(node, Hash):
+                id_ = node.id
+            elif isinstance(node, Class):
+                class_name = node.class_name
+            elif isinstance(node, Attrib) and node.operator != '!=':
+                # [name!=value] also matches elements without the attribute
+                attribute = self.matcher._attribute_name(node)
+            node = node.selector
+        if id_ is not None:
+            return self._ids, id_
+        if class_name is not None:
+            return self._classes, class_name
+        tag = self.matcher._tag(node)
+        if tag is not None:
+            return self._tags, tag
+        if attribute is not None:
+            return self._attributes, attribute
+        return self._universal, None
+
+    def _candidates(self, element):
+        """Iterate over the entries of the selectors that may match
+        *element*."""
+        adapter = self.matcher.adapter
+        get = adapter.get
+        for entry in self._universal.get(None, ()):
+            yield entry
+        if self._ids:
+            element_id = get(element, self.matcher.id_attribute)
+            if element_id is not None:
+                for entry in self._ids.get(element_id, ()):
+                    yield entry
+        if self._classes:
+            classes = get(element, 'class')
+            if classes:
+                for class_name in set(split_whitespace(classes)):
+                    for entry in self._classes.get(class_name, ()):
+                        yield entry
+        for entry in self._tags.get(adapter.tag(element), ()):
+            yield entry
+        if self._attributes:
+            for name in adapter.attribute_names(element):
+                for entry in self._attributes.get(name, ()):
+                    yield entry
+
+    def match(self, element, scope=None):
+        """Return the list of the :class:`~cssselect.Selector` objects
+        that match *element*, in the order they were added.
+
+        :param scope:
+            The element that ``:scope`` matches, see
+            :meth:`GenericMatcher.compile`.
+
+        """
+        matched = [entry for entry in self._candidates(element)
+                   if entry[2](element, scope)]
+        matched.sort()
+        return [selector for _, selector, _ in matched]
+
+    def select(self, root):
+        """Return the list of elements in the sub-tree of *root*
+        (including itself) that match any of the selectors,
+        in document order."""
+        return [element for element in self.matcher.adapter.iter(root)
+                if any(function(element, root)
+                       for _, _, function in self._candidates(element))]
+
+
+_default_matcher = GenericMatcher()
+
+
+def select(root, css, matcher=None):
+    """Return the list of elements in the sub-tree of *root*
+    (including itself) that match *css*, in document order.
+
+    :param matcher:
+        The matcher instance to use, :class:`GenericMatcher` by default.
+
+    """
+    return (matcher or _default_matcher).select(root, css)
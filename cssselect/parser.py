@@ -16,6 +16,8 @@ import sys
 import re
 import operator
 
+from cssselect.cache import LRUCache
+
 
 if sys.version_info[0] < 3:
     _unicode = unicode
@@ -45,7 +47,111 @@ class SelectorSyntaxError(SelectorError, SyntaxError):
 
 #### Parsed objects
 
-class Selector(object):
+_setattr = object.__setattr__
+
+
+class _Node(object):
+    """Common base class for parsed objects.
+
+    Parsed objects compare equal when they have the same type and
+    attributes. They can be modified, unless :meth:`freeze` made them
+    immutable: only then are they hashable, like tuples, so that they can
+    be used as dict keys or shared with :class:`SelectorInterner`.
+    Their hash, canonical form and specificity are then computed once.
+
+    """
+    __slots__ = ('_hash', '_cached', '_frozen')
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(
+                '%s objects are immutable' % self.__class__.__name__)
+        _setattr(self, name, value)
+
+    def __delattr__(self, name):
+        if self._frozen:
+            raise AttributeError(
+                '%s objects are immutable' % self.__class__.__name__)
+        object.__delattr__(self, name)
+
+    def freeze(self):
+        """Make this object and its sub-trees immutable, and return it."""
+        # Iterative, for very deep selectors
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if not node._frozen:
+                _setattr(node, '_frozen', True)
+                stack.extend(value for value in node._values()
+                             if isinstance(value, _Node))
+        return self
+
+    @property
+    def frozen(self):
+        """Whether :meth:`freeze` made this object immutable."""
+        return self._frozen
+
+    def _values(self):
+        # The arguments of the constructor, in the order of __slots__
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def _key(self):
+        return tuple(tuple(value) if type(value) is list else value
+                     for value in self._values())
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        if not self._frozen:
+            raise TypeError(
+                'unhashable mutable %s object, see freeze()'
+                % self.__class__.__name__)
+        result = hash((self.__class__.__name__,) + self._key())
+        _setattr(self, '_hash', result)
+        return result
+
+    def __reduce__(self):
+        return self.__class__, self._values()
+
+    def _memoize(self):
+        # Only for immutable objects. Sub-trees use their own cached values.
+        result = self._canonical(), self._specificity()
+        _setattr(self, '_cached', result)
+        return result
+
+    def canonical(self):
+        cached = self._cached
+        if cached is not None:
+            return cached[0]
+        if self._frozen:
+            return self._memoize()[0]
+        return self._canonical()
+
+    def specificity(self):
+        cached = self._cached
+        if cached is not None:
+            return cached[1]
+        if self._frozen:
+            return self._memoize()[1]
+        return self._specificity()
+
+
+class Selector(_Node):
     """
     Represents a parsed selector.
 
@@ -54,33 +160,40 @@ class Selector(object):
     to account for pseudo-elements and reject selectors with unknown
     or unsupported pseudo-elements.
 
+    .. attribute:: pseudo_element
+
+        A :class:`FunctionalPseudoElement`,
+        or the identifier for the pseudo-element as a string,
+        or ``None``.
+
+        +-------------------------+----------------+--------------------------------+
+        |                         | Selector       | Pseudo-element                 |
+        +=========================+================+================================+
+        | CSS3 syntax             | ``a::before``  | ``'before'``                   |
+        +-------------------------+----------------+--------------------------------+
+        | Older syntax            | ``a:before``   | ``'before'``                   |
+        +-------------------------+----------------+--------------------------------+
+        | From the Lists3_ draft, | ``li::marker`` | ``'marker'``                   |
+        | not in Selectors3       |                |                                |
+        +-------------------------+----------------+--------------------------------+
+        | Invalid pseudo-class    | ``li:marker``  | ``None``                       |
+        +-------------------------+----------------+--------------------------------+
+        | Functional              | ``a::foo(2)``  | ``FunctionalPseudoElement(…)`` |
+        +-------------------------+----------------+--------------------------------+
+
+        .. _Lists3: http://www.w3.org/TR/2011/WD-css3-lists-20110524/#marker-pseudoelement
+
     """
+    __slots__ = ('parsed_tree', 'pseudo_element')
+
     def __init__(self, tree, pseudo_element=None):
-        self.parsed_tree = tree
+        _setattr(self, 'parsed_tree', tree)
         if pseudo_element is not None and not isinstance(
                 pseudo_element, FunctionalPseudoElement):
             pseudo_element = ascii_lower(pseudo_element)
-        #: A :class:`FunctionalPseudoElement`,
-        #: or the identifier for the pseudo-element as a string,
-        #  or ``None``.
-        #:
-        #: +-------------------------+----------------+--------------------------------+
-        #: |                         | Selector       | Pseudo-element                 |
-        #: +=========================+================+================================+
-        #: | CSS3 syntax             | ``a::before``  | ``'before'``                   |
-        #: +-------------------------+----------------+--------------------------------+
-        #: | Older syntax            | ``a:before``   | ``'before'``                   |
-        #: +-------------------------+----------------+--------------------------------+
-        #: | From the Lists3_ draft, | ``li::marker`` | ``'marker'``                   |
-        #: | not in Selectors3       |                |                                |
-        #: +-------------------------+----------------+--------------------------------+
-        #: | Invalid pseudo-class    | ``li:marker``  | ``None``                       |
-        #: +-------------------------+----------------+--------------------------------+
-        #: | Functional              | ``a::foo(2)``  | ``FunctionalPseudoElement(…)`` |
-        #: +-------------------------+----------------+--------------------------------+
-        #:
-        #: .. _Lists3: http://www.w3.org/TR/2011/WD-css3-lists-20110524/#marker-pseudoelement
-        self.pseudo_element = pseudo_element
+        _setattr(self, 'pseudo_element', pseudo_element)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         if isinstance(self.pseudo_element, FunctionalPseudoElement):
@@ -95,6 +208,17 @@ class Selector(object):
     def canonical(self):
         """Return a CSS representation for this selector (a string)
         """
+        return _Node.canonical(self)
+
+    def specificity(self):
+        """Return the specificity_ of this selector as a tuple of 3 integers.
+
+        .. _specificity: http://www.w3.org/TR/selectors/#specificity
+
+        """
+        return _Node.specificity(self)
+
+    def _canonical(self):
         if isinstance(self.pseudo_element, FunctionalPseudoElement):
             pseudo_element = '::%s' % self.pseudo_element.canonical()
         elif self.pseudo_element:
@@ -106,40 +230,38 @@ class Selector(object):
             res = res.lstrip('*')
         return res
 
-    def specificity(self):
-        """Return the specificity_ of this selector as a tuple of 3 integers.
-
-        .. _specificity: http://www.w3.org/TR/selectors/#specificity
-
-        """
+    def _specificity(self):
         a, b, c = self.parsed_tree.specificity()
         if self.pseudo_element:
             c += 1
         return a, b, c
 
 
-class Class(object):
+class Class(_Node):
     """
     Represents selector.class_name
     """
+    __slots__ = ('selector', 'class_name')
+
     def __init__(self, selector, class_name):
-        self.selector = selector
-        self.class_name = class_name
+        _setattr(self, 'selector', selector)
+        _setattr(self, 'class_name', class_name)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         return '%s[%r.%s]' % (
             self.__class__.__name__, self.selector, self.class_name)
 
-    def canonical(self):
+    def _canonical(self):
         return '%s.%s' % (self.selector.canonical(), self.class_name)
 
-    def specificity(self):
+    def _specificity(self):
         a, b, c = self.selector.specificity()
-        b += 1
-        return a, b, c
+        return a, b + 1, c
 
 
-class FunctionalPseudoElement(object):
+class FunctionalPseudoElement(_Node):
     """
     Represents selector::name(arguments)
 
@@ -156,9 +278,13 @@ class FunctionalPseudoElement(object):
         Use at your own risks.
 
     """
+    __slots__ = ('name', 'arguments')
+
     def __init__(self, name, arguments):
-        self.name = ascii_lower(name)
-        self.arguments = arguments
+        _setattr(self, 'name', ascii_lower(name))
+        _setattr(self, 'arguments', arguments)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         return '%s[::%s(%r)]' % (
@@ -168,24 +294,27 @@ class FunctionalPseudoElement(object):
     def argument_types(self):
         return [token.type for token in self.arguments]
 
-    def canonical(self):
+    def _canonical(self):
         args = ''.join(token.css() for token in self.arguments)
         return '%s(%s)' % (self.name, args)
 
-    def specificity(self):
-        a, b, c = self.selector.specificity()
-        b += 1
-        return a, b, c
+    def _specificity(self):
+        # Counted like a type selector in Selector.specificity()
+        return 0, 0, 1
 
 
-class Function(object):
+class Function(_Node):
     """
     Represents selector:name(expr)
     """
+    __slots__ = ('selector', 'name', 'arguments')
+
     def __init__(self, selector, name, arguments):
-        self.selector = selector
-        self.name = ascii_lower(name)
-        self.arguments = arguments
+        _setattr(self, 'selector', selector)
+        _setattr(self, 'name', ascii_lower(name))
+        _setattr(self, 'arguments', arguments)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         return '%s[%r:%s(%r)]' % (
@@ -195,71 +324,81 @@ class Function(object):
     def argument_types(self):
         return [token.type for token in self.arguments]
 
-    def canonical(self):
+    def _canonical(self):
         args = ''.join(token.css() for token in self.arguments)
         return '%s:%s(%s)' % (self.selector.canonical(), self.name, args)
 
-    def specificity(self):
+    def _specificity(self):
         a, b, c = self.selector.specificity()
-        b += 1
-        return a, b, c
+        return a, b + 1, c
 
 
-class Pseudo(object):
+class Pseudo(_Node):
     """
     Represents selector:ident
     """
+    __slots__ = ('selector', 'ident')
+
     def __init__(self, selector, ident):
-        self.selector = selector
-        self.ident = ascii_lower(ident)
+        _setattr(self, 'selector', selector)
+        _setattr(self, 'ident', ascii_lower(ident))
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         return '%s[%r:%s]' % (
             self.__class__.__name__, self.selector, self.ident)
 
-    def canonical(self):
+    def _canonical(self):
         return '%s:%s' % (self.selector.canonical(), self.ident)
 
-    def specificity(self):
+    def _specificity(self):
         a, b, c = self.selector.specificity()
-        b += 1
-        return a, b, c
+        return a, b + 1, c
 
 
-class Negation(object):
+class Negation(_Node):
     """
     Represents selector:not(subselector)
     """
+    __slots__ = ('selector', 'subselector')
+
     def __init__(self, selector, subselector):
-        self.selector = selector
-        self.subselector = subselector
+        _setattr(self, 'selector', selector)
+        _setattr(self, 'subselector', subselector)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         return '%s[%r:not(%r)]' % (
             self.__class__.__name__, self.selector, self.subselector)
 
-    def canonical(self):
+    def _canonical(self):
         subsel = self.subselector.canonical()
         if len(subsel) > 1:
             subsel = subsel.lstrip('*')
         return '%s:not(%s)' % (self.selector.canonical(), subsel)
 
-    def specificity(self):
+    def _specificity(self):
         a1, b1, c1 = self.selector.specificity()
         a2, b2, c2 = self.subselector.specificity()
         return a1 + a2, b1 + b2, c1 + c2
 
 
-class Attrib(object):
+class Attrib(_Node):
     """
     Represents selector[namespace|attrib operator value]
     """
+    __slots__ = ('selector', 'namespace', 'attrib', 'operator', 'value')
+
     def __init__(self, selector, namespace, attrib, operator, value):
-        self.selector = selector
-        self.namespace = namespace
-        self.attrib = attrib
-        self.operator = operator
-        self.value = value
+        _setattr(self, 'selector', selector)
+        _setattr(self, 'namespace', namespace)
+        _setattr(self, 'attrib', attrib)
+        _setattr(self, 'operator', operator)
+        _setattr(self, 'value', value)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         if self.namespace:
@@ -274,7 +413,7 @@ class Attrib(object):
                 self.__class__.__name__, self.selector, attrib,
                 self.operator, self.value.value)
 
-    def canonical(self):
+    def _canonical(self):
         if self.namespace:
             attrib = '%s|%s' % (self.namespace, self.attrib)
         else:
@@ -287,66 +426,76 @@ class Attrib(object):
 
         return '%s[%s]' % (self.selector.canonical(), op)
 
-    def specificity(self):
+    def _specificity(self):
         a, b, c = self.selector.specificity()
-        b += 1
-        return a, b, c
+        return a, b + 1, c
 
 
-class Element(object):
+class Element(_Node):
     """
     Represents namespace|element
 
     `None` is for the universal selector '*'
 
     """
+    __slots__ = ('namespace', 'element')
+
     def __init__(self, namespace=None, element=None):
-        self.namespace = namespace
-        self.element = element
+        _setattr(self, 'namespace', namespace)
+        _setattr(self, 'element', element)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         return '%s[%s]' % (self.__class__.__name__, self.canonical())
 
-    def canonical(self):
+    def _canonical(self):
         element = self.element or '*'
         if self.namespace:
             element = '%s|%s' % (self.namespace, element)
         return element
 
-    def specificity(self):
+    def _specificity(self):
         if self.element:
             return 0, 0, 1
         else:
             return 0, 0, 0
 
 
-class Hash(object):
+class Hash(_Node):
     """
     Represents selector#id
     """
+    __slots__ = ('selector', 'id')
+
     def __init__(self, selector, id):
-        self.selector = selector
-        self.id = id
+        _setattr(self, 'selector', selector)
+        _setattr(self, 'id', id)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         return '%s[%r#%s]' % (
             self.__class__.__name__, self.selector, self.id)
 
-    def canonical(self):
+    def _canonical(self):
         return '%s#%s' % (self.selector.canonical(), self.id)
 
-    def specificity(self):
+    def _specificity(self):
         a, b, c = self.selector.specificity()
-        a += 1
-        return a, b, c
+        return a + 1, b, c
+
 
+class CombinedSelector(_Node):
+    __slots__ = ('selector', 'combinator', 'subselector')
 
-class CombinedSelector(object):
     def __init__(self, selector, combinator, subselector):
         assert selector is not None
-        self.selector = selector
-        self.combinator = combinator
-        self.subselector = subselector
+        _setattr(self, 'selector', selector)
+        _setattr(self, 'combinator', combinator)
+        _setattr(self, 'subselector', subselector)
+        _setattr(self, '_cached', None)
+        _setattr(self, '_frozen', False)
 
     def __repr__(self):
         if self.combinator == ' ':
@@ -356,19 +505,91 @@ class CombinedSelector(object):
         return '%s[%r %s %r]' % (
             self.__class__.__name__, self.selector, comb, self.subselector)
 
-    def canonical(self):
+    def _canonical(self):
         subsel = self.subselector.canonical()
         if len(subsel) > 1:
             subsel = subsel.lstrip('*')
         return '%s %s %s' % (
             self.selector.canonical(), self.combinator, subsel)
 
-    def specificity(self):
+    def _specificity(self):
         a1, b1, c1 = self.selector.specificity()
         a2, b2, c2 = self.subselector.specificity()
         return a1 + a2, b1 + b2, c1 + c2
 
 
+class SelectorInterner(object):
+    """Hash-consing table for parsed objects.
+
+    :meth:`intern` returns a parsed object equal to its argument, sharing
+    every sub-tree with the objects interned before. When many similar
+    selectors are kept in memory, eg. ``Element[div]`` or
+    ``Class[Element[*].product]``, each distinct sub-tree is stored once.
+
+    """
+    def __init__(self):
+        self._table = {}
+
+    def __len__(self):
+        return len(self._table)
+
+    def intern(self, node):
+        """Return the shared object equal to *node*, a :class:`Selector`
+        or any other parsed object."""
+        table = self._table
+        if node._frozen:
+            try:
+                return table[node]
+            except KeyError:
+                pass
+        values = node._values()
+        shared = tuple(
+            self.intern(value) if isinstance(value, _Node) else value
+            for value in values)
+        # Shared objects are immutable, but the argument is left as is
+        if not node._frozen or any(
+                a is not b for a, b in zip(values, shared)):
+            node = node.__class__(*shared).freeze()
+        return table.setdefault(node, node)
+
+    def clear(self):
+        """Forget every interned object."""
+        self._table.clear()
+
+
+def specificities(selectors):
+    """Return the specificity of each of *selectors*, in order.
+
+    The result is the same as calling :meth:`Selector.specificity` on each
+    selector, but sub-trees are computed iteratively from the bottom up,
+    so it works for arbitrarily deep selectors.
+
+    """
+    pending = []
+    stack = list(selectors)
+    while stack:
+        node = stack.pop()
+        if node._cached is None:
+            pending.append(node)
+            for name in node.__slots__:
+                value = getattr(node, name)
+                if isinstance(value, _Node):
+                    stack.append(value)
+    # Children come after their parents in pending. Mutable objects
+    # only keep their specificity, until the end of this call.
+    for node in reversed(pending):
+        if node._frozen:
+            node._memoize()
+        else:
+            _setattr(node, '_cached', (None, node._specificity()))
+    try:
+        return [selector.specificity() for selector in selectors]
+    finally:
+        for node in pending:
+            if not node._frozen:
+                _setattr(node, '_cached', None)
+
+
 #### Parser
 
 # foo
@@ -381,8 +602,54 @@ _id_re = re.compile(r'^[ \t\r\n\f]*([a-zA-Z]*)#([a-zA-Z0-9_-]+)[ \t\r\n\f]*$')
 _class_re = re.compile(
     r'^[ \t\r\n\f]*([a-zA-Z]*)\.([a-zA-Z][a-zA-Z0-9_-]*)[ \t\r\n\f]*$')
 
+# Building blocks for the fast path of compound selectors without
+# escapes, comments, pseudo-classes or namespaces, eg. div.a.b,
+# meta[property="og:title"], ul > li or .a .b
+_fast_ident = r'-?[a-zA-Z_][a-zA-Z0-9_-]*'
+_match_fast_whitespace = re.compile(r'[ \t\r\n\f]*').match
+_match_fast_element = re.compile(r'\*|%s' % _fast_ident).match
+_match_fast_simple = re.compile(
+    r'\.(?P<class>%(ident)s)'
+    r'|#(?P<hash>[a-zA-Z0-9_-]+)'
+    r'|\[[ \t\r\n\f]*(?P<attrib>%(ident)s)[ \t\r\n\f]*'
+    r'(?:(?P<operator>[~^$*|!]?=)[ \t\r\n\f]*'
+    r'(?:(?P<ident>%(ident)s)'
+    r'|"(?P<dq>[^"\\\n\r\f]*)"'
+    r"|'(?P<sq>[^'\\\n\r\f]*)')"
+    r'[ \t\r\n\f]*)?\]' % {'ident': _fast_ident}).match
+_match_fast_combinator = re.compile(
+    r'[ \t\r\n\f]*(?:([>+~])[ \t\r\n\f]*|\Z)|[ \t\r\n\f]+').match
+
+
+_parse_cache = None
+
+
+def set_parse_cache(maxsize=1024):
+    """Enable or disable memoization of :func:`parse`.
+
+    Parsed selectors are shared between calls with the same string,
+    so they are immutable, as with ``parse(css, immutable=True)``.
+
+    :param maxsize:
+        The number of distinct selector strings to keep,
+        or ``None`` to disable the cache.
+    :returns:
+        The new :class:`~cssselect.cache.LRUCache`, or ``None``.
+        Its ``hits``, ``misses`` and ``evictions`` attributes
+        and its ``clear()`` method can be used to monitor it.
+
+    """
+    global _parse_cache
+    _parse_cache = LRUCache(maxsize) if maxsize else None
+    return _parse_cache
+
 
-def parse(css):
+def get_parse_cache():
+    """Return the cache installed by :func:`set_parse_cache`, or ``None``."""
+    return _parse_cache
+
+
+def parse(css, immutable=False):
     """Parse a CSS *group of selectors*.
 
     If you don't care about pseudo-elements or selector specificity,
@@ -390,6 +657,10 @@ def parse(css):
 
     :param css:
         A *group of selectors* as an Unicode string.
+    :param immutable:
+        If true, the parsed objects are made immutable with
+        :meth:`~Selector.freeze`. They always are when the cache of
+        :func:`set_parse_cache` is enabled, since they are shared.
     :raises:
         :class:`SelectorSyntaxError` on invalid selectors.
     :returns:
@@ -397,6 +668,21 @@ def parse(css):
         selector in the comma-separated group.
 
     """
+    cache = _parse_cache
+    if cache is None:
+        result = _parse(css)
+        if immutable:
+            for selector in result:
+                selector.freeze()
+        return result
+    result = cache.get(css)
+    if result is None:
+        result = tuple(selector.freeze() for selector in _parse(css))
+        cache.set(css, result)
+    return list(result)
+
+
+def _parse(css):
     # Fast path for simple cases
     match = _el_re.match(css)
     if match:
@@ -410,6 +696,10 @@ def parse(css):
         return [Selector(Class(Element(element=match.group(1) or None),
                                match.group(2)))]
 
+    result = _parse_fast(css)
+    if result is not None:
+        return result
+
     stream = TokenStream(tokenize(css))
     stream.source = css
     return list(parse_selector_group(stream))
@@ -422,11 +712,77 @@ def parse(css):
 #        raise
 
 
+def _parse_fast(css):
+    """Parse a single selector made of type, class, ID and attribute
+    selectors joined by combinators, without going through the tokenizer.
+
+    Return ``None`` for anything else, including invalid selectors,
+    so that the full parser can handle them or report errors.
+
+    """
+    len_css = len(css)
+    pos = _match_fast_whitespace(css).end()
+    result = None
+    while 1:
+        compound_start = pos
+        match = _match_fast_element(css, pos)
+        if match is None:
+            element = None
+        else:
+            pos = match.end()
+            element = match.group()
+            if element == '*':
+                element = None
+        compound = Element(None, element)
+        while 1:
+            match = _match_fast_simple(css, pos)
+            if match is None:
+                break
+            if match.group('class') is not None:
+                compound = Class(compound, match.group('class'))
+            elif match.group('hash') is not None:
+                compound = Hash(compound, match.group('hash'))
+            else:
+                op = match.group('operator')
+                if op is None:
+                    compound = Attrib(compound, None, match.group('attrib'),
+                                      'exists', None)
+                else:
+                    if match.group('ident') is not None:
+                        value = Token('IDENT', match.group('ident'),
+                                      match.start('ident'))
+                    elif match.group('dq') is not None:
+                        value = Token('STRING', match.group('dq'),
+                                      match.start('dq') - 1)
+                    else:
+                        value = Token('STRING', match.group('sq'),
+                                      match.start('sq') - 1)
+                    compound = Attrib(compound, None, match.group('attrib'),
+                                      op, value)
+            pos = match.end()
+        if pos == compound_start:
+            # Empty compound selector
+            return None
+        if result is None:
+            result = compound
+        else:
+            result = CombinedSelector(result, combinator, compound)
+        match = _match_fast_combinator(css, pos)
+        if match is None:
+            return None
+        combinator = match.group(1)
+        pos = match.end()
+        if combinator is None:
+            if pos == len_css:
+                return [Selector(result)]
+            combinator = ' '
+
+
 def parse_selector_group(stream):
     stream.skip_whitespace()
     while 1:
         yield Selector(*parse_selector(stream))
-        if stream.peek() == ('DELIM', ','):
+        if stream.peek().is_delim(','):
             stream.next()
             stream.skip_whitespace()
         else:
@@ -437,7 +793,7 @@ def parse_selector(stream):
     while 1:
         stream.skip_whitespace()
         peek = stream.peek()
-        if peek in (('EOF', None), ('DELIM', ',')):
+        if peek.type == 'EOF' or peek.is_delim(','):
             break
         if pseudo_element:
             raise SelectorSyntaxError(
@@ -458,15 +814,15 @@ def parse_selector(stream):
 
 def parse_simple_selector(stream, inside_negation=False):
     stream.skip_whitespace()
-    selector_start = len(stream.used)
+    selector_start = stream.index
     peek = stream.peek()
-    if peek.type == 'IDENT' or peek == ('DELIM', '*'):
+    if peek.type == 'IDENT' or peek.is_delim('*'):
         if peek.type == 'IDENT':
             namespace = stream.next().value
         else:
             stream.next()
             namespace = None
-        if stream.peek() == ('DELIM', '|'):
+        if stream.peek().is_delim('|'):
             stream.next()
             element = stream.next_ident_or_star()
         else:
@@ -479,7 +835,7 @@ def parse_simple_selector(stream, inside_negation=False):
     while 1:
         peek = stream.peek()
         if peek.type in ('S', 'EOF') or peek.is_delim(',', '+', '>', '~') or (
-                inside_negation and peek == ('DELIM', ')')):
+                inside_negation and peek.is_delim(')')):
             break
         if pseudo_element:
             raise SelectorSyntaxError(
@@ -487,21 +843,21 @@ def parse_simple_selector(stream, inside_negation=False):
                 % pseudo_element)
         if peek.type == 'HASH':
             result = Hash(result, stream.next().value)
-        elif peek == ('DELIM', '.'):
+        elif peek.is_delim('.'):
             stream.next()
             result = Class(result, stream.next_ident())
-        elif peek == ('DELIM', '|'):
+        elif peek.is_delim('|'):
             stream.next()
             result = Element(None, stream.next_ident())
-        elif peek == ('DELIM', '['):
+        elif peek.is_delim('['):
             stream.next()
             result = parse_attrib(result, stream)
-        elif peek == ('DELIM', ':'):
+        elif peek.is_delim(':'):
             stream.next()
-            if stream.peek() == ('DELIM', ':'):
+            if stream.peek().is_delim(':'):
                 stream.next()
                 pseudo_element = stream.next_ident()
-                if stream.peek() == ('DELIM', '('):
+                if stream.peek().is_delim('('):
                     stream.next()
                     pseudo_element = FunctionalPseudoElement(
                         pseudo_element, parse_arguments(stream))
@@ -513,12 +869,12 @@ def parse_simple_selector(stream, inside_negation=False):
                 # Any new pseudo-element must have two.
                 pseudo_element = _unicode(ident)
                 continue
-            if stream.peek() != ('DELIM', '('):
+            if not stream.peek().is_delim('('):
                 result = Pseudo(result, ident)
-                if result.__repr__() == 'Pseudo[Element[*]:scope]':
-                    if not (len(stream.used) == 2 or
-                            (len(stream.used) == 3
-                             and stream.used[0].type == 'S')):
+                if result.ident == 'scope' and _is_universal(result.selector):
+                    if not (stream.index == 2 or
+                            (stream.index == 3
+                             and stream.tokens[0].type == 'S')):
                         raise SelectorSyntaxError(
                             'Got immediate child pseudo-element ":scope" '
                             'not at the start of a selector')
@@ -535,7 +891,7 @@ def parse_simple_selector(stream, inside_negation=False):
                     raise SelectorSyntaxError(
                         'Got pseudo-element ::%s inside :not() at %s'
                         % (argument_pseudo_element, next.pos))
-                if next != ('DELIM', ')'):
+                if not next.is_delim(')'):
                     raise SelectorSyntaxError("Expected ')', got %s" % (next,))
                 result = Negation(result, argument)
             else:
@@ -543,21 +899,27 @@ def parse_simple_selector(stream, inside_negation=False):
         else:
             raise SelectorSyntaxError(
                 "Expected selector, got %s" % (peek,))
-    if len(stream.used) == selector_start:
+    if stream.index == selector_start:
         raise SelectorSyntaxError(
             "Expected selector, got %s" % (stream.peek(),))
     return result, pseudo_element
 
 
+def _is_universal(selector):
+    """Whether *selector* is a bare ``*``, without a namespace."""
+    return (type(selector) is Element and selector.element is None
+            and selector.namespace is None)
+
+
 def parse_arguments(stream):
     arguments = []
     while 1:
         stream.skip_whitespace()
         next = stream.next()
-        if next.type in ('IDENT', 'STRING', 'NUMBER') or next in [
-                ('DELIM', '+'), ('DELIM', '-')]:
+        if next.type in ('IDENT', 'STRING', 'NUMBER') or next.is_delim(
+                '+', '-'):
             arguments.append(next)
-        elif next == ('DELIM', ')'):
+        elif next.is_delim(')'):
             return arguments
         else:
             raise SelectorSyntaxError(
@@ -567,12 +929,12 @@ def parse_arguments(stream):
 def parse_attrib(selector, stream):
     stream.skip_whitespace()
     attrib = stream.next_ident_or_star()
-    if attrib is None and stream.peek() != ('DELIM', '|'):
+    if attrib is None and not stream.peek().is_delim('|'):
         raise SelectorSyntaxError(
             "Expected '|', got %s" % (stream.peek(),))
-    if stream.peek() == ('DELIM', '|'):
+    if stream.peek().is_delim('|'):
         stream.next()
-        if stream.peek() == ('DELIM', '='):
+        if stream.peek().is_delim('='):
             namespace = None
             stream.next()
             op = '|='
@@ -585,12 +947,12 @@ def parse_attrib(selector, stream):
     if op is None:
         stream.skip_whitespace()
         next = stream.next()
-        if next == ('DELIM', ']'):
+        if next.is_delim(']'):
             return Attrib(selector, namespace, attrib, 'exists', None)
-        elif next == ('DELIM', '='):
+        elif next.is_delim('='):
             op = '='
         elif next.is_delim('^', '$', '*', '~', '|', '!') and (
-                stream.peek() == ('DELIM', '=')):
+                stream.peek().is_delim('=')):
             op = next.value + '='
             stream.next()
         else:
@@ -603,7 +965,7 @@ def parse_attrib(selector, stream):
             "Expected string or ident, got %s" % (value,))
     stream.skip_whitespace()
     next = stream.next()
-    if next != ('DELIM', ']'):
+    if not next.is_delim(']'):
         raise SelectorSyntaxError(
             "Expected ']', got %s" % (next,))
     return Attrib(selector, namespace, attrib, op, value)
@@ -646,21 +1008,51 @@ def parse_series(tokens):
 
 #### Token objects
 
-class Token(tuple):
-    def __new__(cls, type_, value, pos):
-        obj = tuple.__new__(cls, (type_, value))
-        obj.pos = pos
-        return obj
+class Token(object):
+    """A token with a type, a value and a position in the source.
+
+    Tokens compare equal to ``(type, value)`` tuples.
+
+    """
+    __slots__ = ('type', 'value', 'pos')
+
+    def __init__(self, type_, value, pos):
+        self.type = type_
+        self.value = value
+        self.pos = pos
 
     def __repr__(self):
         return "<%s '%s' at %i>" % (self.type, self.value, self.pos)
 
+    def __eq__(self, other):
+        if isinstance(other, Token):
+            return self.type == other.type and self.value == other.value
+        if isinstance(other, tuple):
+            return (self.type, self.value) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash((self.type, self.value))
+
+    def __iter__(self):
+        yield self.type
+        yield self.value
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, index):
+        return (self.type, self.value)[index]
+
     def is_delim(self, *values):
         return self.type == 'DELIM' and self.value in values
 
-    type = property(operator.itemgetter(0))
-    value = property(operator.itemgetter(1))
-
     def css(self):
         if self.type == 'STRING':
             return repr(self.value)
@@ -669,8 +1061,10 @@ class Token(tuple):
 
 
 class EOFToken(Token):
-    def __new__(cls, pos):
-        return Token.__new__(cls, 'EOF', None, pos)
+    __slots__ = ()
+
+    def __init__(self, pos):
+        Token.__init__(self, 'EOF', None, pos)
 
     def __repr__(self):
         return '<%s at %i>' % (self.type, self.pos)
@@ -690,10 +1084,18 @@ class TokenMacros:
 def _compile(pattern):
     return re.compile(pattern % vars(TokenMacros), re.IGNORECASE).match
 
-_match_whitespace = _compile(r'[ \t\r\n\f]+')
-_match_number = _compile(r'[+-]?(?:[0-9]*\.[0-9]+|[0-9]+)')
-_match_hash = _compile('#(?:%(nmchar)s)+')
-_match_ident = _compile('-?(?:%(nmstart)s)(?:%(nmchar)s)*')
+# One alternation for every token type, tried in the order of the CSS
+# tokenizer. The name of the group that matched is the token type.
+_match_token = _compile(
+    r'(?P<S>[ \t\r\n\f]+)'
+    r'|(?P<IDENT>-?(?:%(nmstart)s)(?:%(nmchar)s)*)'
+    r'|(?P<HASH>#(?:%(nmchar)s)+)'
+    r'|(?P<STRING>"(?:[^\n\r\f\\"]|%(string_escape)s)*"'
+    r"|'(?:[^\n\r\f\\']|%(string_escape)s)*')"
+    r'|(?P<QUOTE>["\'])'
+    r'|(?P<NUMBER>[+-]?(?:[0-9]*\.[0-9]+|[0-9]+))'
+    r'|(?P<COMMENT>/\*[\s\S]*?(?:\*/|\Z))'
+    r'|(?P<DELIM>[\s\S])')
 _match_string_by_quote = {
     "'": _compile(r"([^\n\r\f\\']|%(string_escape)s)*"),
     '"': _compile(r'([^\n\r\f\\"]|%(string_escape)s)*'),
@@ -723,62 +1125,36 @@ def tokenize(s):
     pos = 0
     len_s = len(s)
     while pos < len_s:
-        match = _match_whitespace(s, pos=pos)
-        if match:
-            yield Token('S', ' ', pos)
-            pos = match.end()
-            continue
-
-        match = _match_ident(s, pos=pos)
-        if match:
-            value = _sub_simple_escape(_replace_simple,
-                    _sub_unicode_escape(_replace_unicode, match.group()))
+        match = _match_token(s, pos)
+        type_ = match.lastgroup
+        if type_ == 'IDENT':
+            value = match.group()
+            if '\\' in value:
+                value = unescape_ident(value)
             yield Token('IDENT', value, pos)
-            pos = match.end()
-            continue
-
-        match = _match_hash(s, pos=pos)
-        if match:
-            value = _sub_simple_escape(_replace_simple,
-                    _sub_unicode_escape(_replace_unicode, match.group()[1:]))
+        elif type_ == 'DELIM':
+            yield Token('DELIM', match.group(), pos)
+        elif type_ == 'S':
+            yield Token('S', ' ', pos)
+        elif type_ == 'HASH':
+            value = match.group()[1:]
+            if '\\' in value:
+                value = unescape_ident(value)
             yield Token('HASH', value, pos)
-            pos = match.end()
-            continue
-
-        quote = s[pos]
-        if quote in _match_string_by_quote:
-            match = _match_string_by_quote[quote](s, pos=pos + 1)
-            assert match, 'Should have found at least an empty match'
-            end_pos = match.end()
-            if end_pos == len_s:
-                raise SelectorSyntaxError('Unclosed string at %s' % pos)
-            if s[end_pos] != quote:
-                raise SelectorSyntaxError('Invalid string at %s' % pos)
-            value = _sub_simple_escape(_replace_simple,
-                    _sub_unicode_escape(_replace_unicode,
-                    _sub_newline_escape('', match.group())))
+        elif type_ == 'STRING':
+            value = match.group()[1:-1]
+            if '\\' in value:
+                value = unescape_ident(_sub_newline_escape('', value))
             yield Token('STRING', value, pos)
-            pos = end_pos + 1
-            continue
-
-        match = _match_number(s, pos=pos)
-        if match:
-            value = match.group()
-            yield Token('NUMBER', value, pos)
-            pos = match.end()
-            continue
-
-        pos2 = pos + 2
-        if s[pos:pos2] == '/*':
-            pos = s.find('*/', pos2)
-            if pos == -1:
-                pos = len_s
-            else:
-                pos += 2
-            continue
-
-        yield Token('DELIM', s[pos], pos)
-        pos += 1
+        elif type_ == 'NUMBER':
+            yield Token('NUMBER', match.group(), pos)
+        elif type_ == 'QUOTE':
+            # Not a valid string: find out why.
+            match = _match_string_by_quote[s[pos]](s, pos=pos + 1)
+            if match.end() == len_s:
+                raise SelectorSyntaxError('Unclosed string at %s' % pos)
+            raise SelectorSyntaxError('Invalid string at %s' % pos)
+        pos = match.end()
 
     assert pos == len_s
     yield EOFToken(pos)
@@ -786,32 +1162,22 @@ def tokenize(s):
 
 class TokenStream(object):
     def __init__(self, tokens, source=None):
-        self.used = []
-        self.tokens = iter(tokens)
+        self.tokens = list(tokens)
+        self.index = 0
         self.source = source
-        self.peeked = None
-        self._peeking = False
-        try:
-            self.next_token = self.tokens.next
-        except AttributeError:
-            # Python 3
-            self.next_token = self.tokens.__next__
+
+    @property
+    def used(self):
+        """The tokens consumed so far."""
+        return self.tokens[:self.index]
 
     def next(self):
-        if self._peeking:
-            self._peeking = False
-            self.used.append(self.peeked)
-            return self.peeked
-        else:
-            next = self.next_token()
-            self.used.append(next)
-            return next
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
 
     def peek(self):
-        if not self._peeking:
-            self.peeked = self.next_token()
-            self._peeking = True
-        return self.peeked
+        return self.tokens[self.index]
 
     def next_ident(self):
         next = self.next()
@@ -823,13 +1189,12 @@ class TokenStream(object):
         next = self.next()
         if next.type == 'IDENT':
             return next.value
-        elif next == ('DELIM', '*'):
+        elif next.is_delim('*'):
             return None
         else:
             raise SelectorSyntaxError(
                 "Expected ident or '*', got %s" % (next,))
 
     def skip_whitespace(self):
-        peek = self.peek()
-        if peek.type == 'S':
-            self.next()
+        if self.tokens[self.index].type == 'S':
+            self.index += 1
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+    cssselect.streaming
+    ===================
+
+    Match selectors against a stream of parser events, without building
+    the whole document tree: only the currently open elements are kept.
+
+
+    :copyright: (c) 2007-2012 Ian Bicking and contributors.
+                See AUTHORS for more details.
+    :license: BSD, see LICENSE for more details.
+
+"""
+
+from operator import attrgetter
+
+from cssselect.adapters import TreeAdapter
+from cssselect.matching import GenericMatcher
+from cssselect.xpath import ExpressionError
+
+
+class _StreamAdapter(TreeAdapter):
+    """Gives access to the open elements of a stream.
+
+    Only the parent and the closest previous sibling of open elements are
+    known, which is all the selectors supported by :class:`StreamMatcher`
+    need.
+
+    """
+    def __init__(self):
+        #: Maps open elements to their parent and previous sibling
+        self.links = {}
+
+    tag = staticmethod(attrgetter('tag'))
+
+    def parent(self, element):
+        link = self.links.get(element)
+        return link[0] if link is not None else None
+
+    def previous_siblings(self, element):
+        link = self.links.get(element)
+        if link is None or link[1] is None:
+            return ()
+        return (link[1],)
+
+    @staticmethod
+    def get(element, name):
+        return element.get(name)
+
+
+class StreamMatcher(GenericMatcher):
+    """
+    Matcher for the ``('start', element)`` and ``('end', element)`` events
+    of :func:`lxml.etree.iterparse` or :class:`xml.etree.ElementTree.
+    XMLPullParser`, with the same behavior as
+    :class:`~cssselect.GenericTranslator`.
+
+    Elements are matched on their start event, so only selectors that do
+    not depend on the content or the following siblings of an element
+    are supported: type, universal, id, class and attribute selectors,
+    ``:not()``, ``:root``, ``:first-child``, and the descendant and child
+    combinators. Others raise :class:`~cssselect.ExpressionError`.
+
+    A matcher follows one stream at a time.
+
+    :param namespaces:
+        A dict of the namespace prefixes used in selectors.
+
+    """
+
+    supported_types = frozenset([
+        'Element', 'Hash', 'Class', 'Attrib', 'Negation', 'Pseudo',
+        'CombinedSelector'])
+    supported_pseudo_classes = frozenset(['root', 'first-child'])
+    supported_combinators = frozenset([' ', '>'])
+
+    def __init__(self, namespaces=None, cache_size=256):
+        super(StreamMatcher, self).__init__(
+            namespaces, cache_size, adapter=_StreamAdapter())
+
+    def match(self, parsed_selector):
+        type_name = type(parsed_selector).__name__
+        if type_name not in self.supported_types:
+            raise ExpressionError(
+                '%s is not supported when streaming.' % type_name)
+        return super(StreamMatcher, self).match(parsed_selector)
+
+    def match_pseudo(self, pseudo):
+        if pseudo.ident not in self.supported_pseudo_classes:
+            raise ExpressionError(
+                'The pseudo-class :%s is not supported when streaming'
+                % pseudo.ident)
+        return super(StreamMatcher, self).match_pseudo(pseudo)
+
+    def match_combinedselector(self, combined):
+        if combined.combinator not in self.supported_combinators:
+            raise ExpressionError(
+                "The combinator '%s' is not supported when streaming"
+                % combined.combinator)
+        return super(StreamMatcher, self).match_combinedselector(combined)
+
+    def iterselect(self, events, css, clear=True):
+        """Iterate over the elements matching *css*, in the order their
+        end tag is read.
+
+        :param events:
+            An iterable of ``(event, element)`` pairs that includes the
+            ``'start'`` and ``'end'`` events of elements. Other events
+            are ignored.
+        :param clear:
+            If true (the default), elements are removed from their parent
+            once they are ended, unless they are in the sub-tree of an
+            element that is yet to be returned. Memory use then only
+            depends on the depth of the document and on the size of the
+            matching elements. Returned elements are complete, but they
+            are also removed from their parent when the iteration resumes.
+        :raises:
+            :class:`~cssselect.SelectorSyntaxError` on invalid selectors,
+            :class:`~cssselect.ExpressionError` on selectors that are
+            unknown or not supported when streaming. Both are raised by
+            this call, before any event is read.
+            :class:`ValueError` while iterating, on an ``'end'`` event
+            without its ``'start'`` event.
+
+        """
+        # Compile now, not on the first iteration
+        function = self.compile(css).function
+        return self._iterselect(events, function, clear)
+
+    def _iterselect(self, events, function, clear):
+        links = self.adapter.links
+        links.clear()
+        # For each open element: the element, whether it matches,
+        # and its last child element so far
+        stack = []
+        # Number of open elements that match
+        kept = 0
+        for event, element in events:
+            if event == 'start':
+                if stack:
+                    top = stack[-1]
+                    links[element] = top[0], top[2]
+                    top[2] = element
+                else:
+                    links[element] = None, None
+                matches = function(element, None)
+                if matches:
+                    kept += 1
+                stack.append([element, matches, None])
+            elif event == 'end':
+                if not stack:
+                    raise ValueError(
+                        "Got the 'end' event of an element without its "
+                        "'start' event. iterselect() needs both, eg. from "
+                        "iterparse(source, events=('start', 'end')).")
+                element, matches, _ = stack.pop()
+                del links[element]
+                if matches:
+                    kept -= 1
+                    yield element
+                if clear and not kept and stack:
+                    # Parsers may have read the next siblings already,
+                    # but the previous ones were removed: this is cheap.
+                    try:
+                        stack[-1][0].remove(element)
+                    except ValueError:
+                        pass  # Already removed by the caller
+
+
+def iterselect(events, css, namespaces=None, clear=True):
+    """Iterate over the elements matching *css* in a stream of parser
+    events, as soon as each one is complete.
+
+    See :meth:`StreamMatcher.iterselect`. For example, with lxml::
+
+        events = lxml.etree.iterparse(filename, events=('start', 'end'))
+        for element in iterselect(events, 'item > title'):
+            print(element.text)
+
+    """
+    return StreamMatcher(namespaces).iterselect(events, css, clear)
@@ -15,7 +15,9 @@
 import sys
 import re
 
-from cssselect.parser import parse, parse_series, SelectorError
+from cssselect.parser import (parse, parse_series, SelectorError,
+                              CombinedSelector, _el_re, _id_re, _class_re)
+from cssselect.cache import LRUCache
 
 
 if sys.version_info[0] < 3:
@@ -38,55 +40,254 @@ class ExpressionError(SelectorError, RuntimeError):
 
 #### XPath Helpers
 
+# Conditions that translators use as boolean constants. A condition alone
+# in a predicate is a number though, so [1] is the same as [position() = 1].
+_TRUE_CONDITIONS = frozenset(['1', 'not(0)'])
+_FALSE_CONDITIONS = frozenset(['0', 'not(1)'])
+_is_number = re.compile(r'^[0-9]+(\.[0-9]*)?$').match
+
+
+def _may_be_position(condition):
+    # Numbers, and expressions that use the context position or size
+    return (_is_number(condition) is not None or 'position()' in condition
+            or 'last()' in condition)
+
+
+def _join_conditions(conditions):
+    if len(conditions) == 1:
+        return conditions[0]
+    return ' and '.join(
+        conditions[:1] + ['(%s)' % c for c in conditions[1:]])
+
+
+class _SiblingCondition(_unicode):
+    """A condition on the number of element siblings, using ``count()``.
+
+    .. attribute:: positional
+
+        The same condition as the first predicate of a step on the child
+        axis, using ``position()`` or ``last()``.
+
+    .. attribute:: of_type
+
+        Whether only the siblings of the same type are counted.
+
+    """
+    def __new__(cls, condition, positional, of_type):
+        self = _unicode.__new__(cls, condition)
+        self.positional = positional
+        self.of_type = of_type
+        return self
+
+
+def _on_child_axis(previous):
+    # Whether a step that comes right after this part of the path
+    # selects children, like in "" + "e", "a/" + "e" or "a//" + "e"
+    return previous is not None and (not previous or previous[-1] == '/')
+
+
+def _has_sibling_condition(conditions):
+    for condition in conditions:
+        if isinstance(condition, _SiblingCondition):
+            return True
+    return False
+
+
 class XPathExpr(object):
+    """An XPath expression being built: a path of steps, ending with
+    *element* and its conditions.
+
+    The path and conditions are kept as lists, and only joined by
+    :meth:`__str__`, so that long selectors translate in linear time.
+    :attr:`path` and :attr:`condition` are still available as strings.
+
+    Sub-classes that override :meth:`__str__` get the left-hand side of
+    :meth:`join` rendered through it right away, like before, at the cost
+    of a quadratic translation. Sub-classes that build an expression from
+    another one (from :attr:`path`, :attr:`element` and :attr:`condition`)
+    should also pass its :attr:`never_matches` and :attr:`fold_constants`.
+
+    Steps on the child axis whose conditions count the siblings of the
+    element (eg. from :meth:`GenericTranslator.xpath_first_child_pseudo`
+    with :attr:`~GenericTranslator.positional_predicates`) start with
+    a positional predicate instead, like ``*[1][self::e]``.
+    A ``/descendant::`` axis before such a step is rendered as ``//``,
+    so that the step is on the child axis.
+
+    .. attribute:: starts_on_child_axis
 
-    def __init__(self, path='', element='*', condition='', star_prefix=False):
-        self.path = path
+        Whether the first step is on the child axis, because of the prefix
+        that :class:`GenericTranslator` prepends to the expression.
+
+    .. attribute:: never_matches
+
+        Whether a condition of the expression is always false,
+        so that it can never match any element.
+
+    .. attribute:: fold_constants
+
+        Whether to drop the conditions that are always true,
+        and the other conditions of a step that never matches,
+        when converting to a string.
+
+    """
+    __slots__ = ('_path', 'element', '_conditions', 'starts_on_child_axis',
+                 'never_matches', 'fold_constants')
+
+    def __init__(self, path='', element='*', condition='', star_prefix=False,
+                 never_matches=False, fold_constants=False):
+        self._path = [path] if path else []
         self.element = element
-        self.condition = condition
+        self._conditions = [condition] if condition else []
+        self.starts_on_child_axis = False
+        self.never_matches = never_matches or condition in _FALSE_CONDITIONS
+        self.fold_constants = fold_constants
+
+    @property
+    def path(self):
+        return ''.join(self._render_path())
+
+    @path.setter
+    def path(self, path):
+        self._path = [path] if path else []
+
+    @property
+    def condition(self):
+        return _join_conditions(self._conditions)
+
+    @condition.setter
+    def condition(self, condition):
+        self._conditions = [condition] if condition else []
+        if condition in _FALSE_CONDITIONS:
+            self.never_matches = True
+
+    def _render_step(self, element, conditions, child_axis):
+        if self.fold_constants and len(conditions) > 1:
+            if any(c in _FALSE_CONDITIONS for c in conditions):
+                conditions = ['0']
+            else:
+                conditions = [c for c in conditions
+                              if c not in _TRUE_CONDITIONS]
+        elif self.fold_constants and conditions == ['not(0)']:
+            conditions = []
+        if child_axis:
+            for i, condition in enumerate(conditions):
+                if isinstance(condition, _SiblingCondition):
+                    return self._render_positional_step(
+                        element, condition,
+                        conditions[:i] + conditions[i + 1:])
+        condition = _join_conditions(conditions)
+        if condition:
+            return '%s[%s]' % (element, condition)
+        return _unicode(element)
+
+    def _render_positional_step(self, element, sibling_condition,
+                                conditions):
+        if conditions == ['1']:
+            # No longer alone in its predicate, so not a position
+            conditions = []
+        if sibling_condition.of_type:
+            step = '%s[%s]' % (element, sibling_condition.positional)
+        else:
+            step = '*[%s]' % sibling_condition.positional
+            if element != '*':
+                conditions = ['self::%s' % element] + conditions
+        if conditions:
+            step += '[%s]' % _join_conditions(conditions)
+        return step
+
+    def _render_next_step(self, parts, element, conditions):
+        if parts:
+            previous = parts[-1]
+        else:
+            previous = '' if self.starts_on_child_axis else None
+        if previous == '/descendant::' and _has_sibling_condition(conditions):
+            # Positions are among the children of a descendant-or-self
+            parts[-1] = previous = '//'
+        return self._render_step(element, conditions, _on_child_axis(previous))
+
+    def _render_path(self):
+        parts = []
+        for part in self._path:
+            if part.__class__ is tuple:
+                part = self._render_next_step(parts, part[0], part[1])
+            parts.append(part)
+        return parts
 
     def __str__(self):
-        path =  _unicode(self.path) + _unicode(self.element)
-        if self.condition:
-            path += '[%s]' % self.condition
-        return path
+        parts = self._render_path()
+        parts.append(self._render_next_step(
+            parts, self.element, self._conditions))
+        return ''.join(parts)
 
     def __repr__(self):
         return '%s[%s]' % (self.__class__.__name__, self)
 
     def add_condition(self, condition):
-        if self.condition:
-            self.condition = '%s and (%s)' % (self.condition, condition)
-        else:
-            self.condition = condition
+        self._conditions.append(condition)
+        if condition in _FALSE_CONDITIONS:
+            self.never_matches = True
         return self
 
     def add_name_test(self):
         if self.element == '*':
             # We weren't doing a test anyway
             return
-        self.add_condition(
-            "name() = %s" % GenericTranslator.xpath_literal(self.element))
+        if is_safe_qname(self.element):
+            # A node test is cheaper to evaluate than comparing strings
+            self.add_condition('self::%s' % self.element)
+        else:
+            self.add_condition(
+                "name() = %s" % GenericTranslator.xpath_literal(self.element))
         self.element = '*'
 
+    def self_condition(self):
+        """Return a condition that tests this step (which must have
+        no path) on the context element, eg. ``self::e and (@x)``.
+        Empty if any element matches, and None if a condition may depend
+        on the position of the element, like ``1`` from ``:scope``.
+        """
+        conditions = self._conditions
+        for condition in conditions:
+            if _may_be_position(condition):
+                return None
+        if self.fold_constants:
+            conditions = [c for c in conditions if c not in _TRUE_CONDITIONS]
+        if self.element != '*':
+            conditions = ['self::%s' % self.element] + conditions
+        return _join_conditions(conditions) if conditions else ''
+
     def add_star_prefix(self):
         """
         Append '*/' to the path to keep the context constrained
         to a single parent.
         """
-        self.path += '*/'
+        self._path.append('*/')
 
     def join(self, combiner, other):
-        path = _unicode(self) + combiner
+        path = self._path
+        if type(self).__str__ is XPathExpr.__str__:
+            # Rendered by __str__, once the axis of the step is known
+            path.append((self.element, self._conditions))
+        else:
+            path = self._path = [_unicode(self)]
+        path.append(combiner)
         # Any "star prefix" is redundant when joining.
-        if other.path != '*/':
-            path += other.path
-        self.path = path
+        if other._path != ['*/']:
+            path.extend(other._path)
         self.element = other.element
-        self.condition = other.condition
+        self._conditions = list(other._conditions)
+        self.never_matches = self.never_matches or other.never_matches
         return self
 
 
+def _prefixed(xpath, prefix):
+    prefix = prefix or ''
+    # Only the axis of the first step depends on the prefix
+    xpath.starts_on_child_axis = _on_child_axis(prefix)
+    return prefix + _unicode(xpath)
+
+
 split_at_single_quotes = re.compile("('+)").split
 
 # The spec is actually more permissive than that, but don’t bother.
@@ -94,12 +295,103 @@ split_at_single_quotes = re.compile("('+)").split
 # http://www.w3.org/TR/REC-xml/#NT-NameStartChar
 is_safe_name = re.compile('^[a-zA-Z_][a-zA-Z0-9_.-]*$').match
 
+
+def is_safe_qname(name):
+    """Whether *name* can be written as a node test, eg. ``self::ns:name``.
+    """
+    parts = name.split(':')
+    return len(parts) <= 2 and all(is_safe_name(part) for part in parts)
+
 # Test that the string is not empty and does not contain whitespace
 is_non_whitespace = re.compile(r'^[^ \t\r\n\f]+$').match
 
 
 #### Translation
 
+_translation_cache = None
+
+
+def set_translation_cache(maxsize=1024):
+    """Enable or disable memoization of
+    :meth:`GenericTranslator.css_to_xpath`.
+
+    Entries are keyed by the selector string, the prefix and the
+    :meth:`~GenericTranslator.config_key` of the translator, so that
+    translators with different settings never share them.
+
+    :param maxsize:
+        The number of distinct translations to keep,
+        or ``None`` to disable the cache.
+    :returns:
+        The new :class:`~cssselect.cache.LRUCache`, or ``None``.
+
+    """
+    global _translation_cache
+    _translation_cache = LRUCache(maxsize) if maxsize else None
+    return _translation_cache
+
+
+def get_translation_cache():
+    """Return the cache installed by :func:`set_translation_cache`,
+    or ``None``."""
+    return _translation_cache
+
+
+# The methods that GenericTranslator._simple_css_to_xpath() bypasses.
+# A sub-class that overrides any of them always uses the full translation.
+_SIMPLE_FAST_PATH_METHODS = (
+    'selector_to_xpath', 'xpath', 'xpath_element', 'xpath_hash',
+    'xpath_class', 'xpath_attrib_equals', 'xpath_attrib_includes',
+    'xpath_literal', 'xpathexpr_cls')
+
+def _class_attribute(cls, name):
+    """Like getattr(cls, name), without the Python 2 unbound method
+    wrappers, so that the result can be compared by identity."""
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return klass.__dict__[name]
+
+
+# Per translator class, the method for each kind of parsed object,
+# combinator, operator and pseudo-class name, looked up on first use.
+# Only methods that exist are recorded, so that unknown pseudo-classes
+# do not fill the tables. Methods set on instances are not used, nor
+# methods replaced on a class after they were recorded.
+
+def _dispatch_table(cls, kind):
+    # Stored in the class itself, so that it is not shared with
+    # sub-classes and does not outlive the class
+    tables = cls.__dict__.get('_dispatch_tables')
+    if tables is None:
+        tables = {}
+        setattr(cls, '_dispatch_tables', tables)
+    try:
+        return tables[kind]
+    except KeyError:
+        return tables.setdefault(kind, {})
+
+
+def _find_method(cls, table, key, name):
+    """Return the function called *name* on *cls*, or None,
+    and record it under *key* in *table*."""
+    method = _unicode_safe_getattr(cls, name)
+    if method is not None:
+        table[key] = method
+    return method
+
+
+def _has_simple_fast_path(cls):
+    # Stored in the class itself, so that it does not outlive the class
+    result = cls.__dict__.get('_simple_fast_path')
+    if result is None:
+        result = all(
+            _class_attribute(cls, name) is
+            _class_attribute(GenericTranslator, name)
+            for name in _SIMPLE_FAST_PATH_METHODS)
+        setattr(cls, '_simple_fast_path', result)
+    return result
+
+
 class GenericTranslator(object):
     """
     Translator for "generic" XML documents.
@@ -165,6 +457,34 @@ class GenericTranslator(object):
     lower_case_attribute_names = False
     lower_case_attribute_values = False
 
+    #: Simplify the generated XPath: drop conditions that are always true,
+    #: reduce the steps that can never match to ``[0]``, and leave out of
+    #: :meth:`css_to_xpath` the selectors that can never match.
+    #: See also :meth:`css_to_xpath_list`.
+    fold_constants = False
+
+    #: Translate the structural pseudo-classes like ``:first-child`` or
+    #: ``:nth-of-type()`` with ``position()`` and ``last()`` rather than by
+    #: counting siblings, when the element is selected on the child axis:
+    #: after the ``>`` or descendant combinator, or at the start with
+    #: a prefix that is empty or ends with ``/``. XPath engines evaluate
+    #: sibling counts for each element, which is quadratic in the number
+    #: of siblings.
+    positional_predicates = False
+
+    #: Translate the descendant combinator to ``a/descendant::b`` rather
+    #: than ``a/descendant-or-self::*/b``, which makes XPath engines like
+    #: libxml2 build the set of all the descendants of ``a`` before
+    #: selecting their children. The matched elements are the same.
+    descendant_axis = False
+
+    #: In :meth:`css_to_xpath`, drop duplicate selectors, and translate
+    #: the selectors that only differ by their last compound selector
+    #: (like ``.product .title, .product .price``) to a single path ending
+    #: with an alternation (``*[(self::e and (...)) or (...)]``), which
+    #: XPath engines evaluate in a single walk.
+    factor_groups = False
+
     # class used to represent and xpath expression
     xpathexpr_cls = XPathExpr
 
@@ -187,9 +507,102 @@ class GenericTranslator(object):
             The equivalent XPath 1.0 expression as an Unicode string.
 
         """
-        return ' | '.join(self.selector_to_xpath(selector, prefix,
-                                                 translate_pseudo_elements=True)
-                          for selector in parse(css))
+        cache = _translation_cache
+        if cache is None:
+            return self._css_to_xpath(css, prefix)
+        key = (css, prefix, self.config_key())
+        xpath = cache.get(key)
+        if xpath is None:
+            xpath = self._css_to_xpath(css, prefix)
+            cache.set(key, xpath)
+        return xpath
+
+    def _css_to_xpath(self, css, prefix):
+        if _has_simple_fast_path(type(self)):
+            xpath = self._simple_css_to_xpath(css)
+            if xpath is not None:
+                return (prefix or '') + xpath
+        if self.factor_groups:
+            xpaths = self._factored_xpathexprs(parse(css, immutable=True))
+        elif not self.fold_constants:
+            return ' | '.join(
+                self.selector_to_xpath(selector, prefix,
+                                       translate_pseudo_elements=True)
+                for selector in parse(css))
+        else:
+            xpaths = [self._selector_to_xpathexpr(selector, True)
+                      for selector in parse(css)]
+        if self.fold_constants:
+            # Keep one branch if none can match, to return a valid expression
+            xpaths = [xpath for xpath in xpaths
+                      if not xpath.never_matches] or xpaths[:1]
+        return ' | '.join(_prefixed(xpath, prefix) for xpath in xpaths)
+
+    def css_to_xpath_list(self, css, prefix='descendant-or-self::'):
+        """Translate a *group of selectors* to a list of XPath expressions,
+        one for each selector that can match some element.
+
+        Parameters and exceptions are the same as for :meth:`css_to_xpath`.
+
+        :returns:
+            A list of XPath 1.0 expressions as Unicode strings.
+            It is empty when no element can ever match,
+            so that evaluating the expression can be skipped entirely.
+
+        """
+        if _has_simple_fast_path(type(self)):
+            xpath = self._simple_css_to_xpath(css)
+            if xpath is not None:
+                return [(prefix or '') + xpath]
+        xpaths = (self._selector_to_xpathexpr(selector, True)
+                  for selector in parse(css))
+        return [_prefixed(xpath, prefix)
+                for xpath in xpaths if not xpath.never_matches]
+
+    def config_key(self):
+        """Return a hashable value for everything that changes the output
+        of this translator, used by :func:`set_translation_cache`.
+
+        Sub-classes with more settings must extend it.
+
+        """
+        return (type(self), self.lower_case_element_names,
+                self.lower_case_attribute_names,
+                self.lower_case_attribute_values,
+                self.id_attribute, self.lang_attribute, self.fold_constants,
+                self.positional_predicates, self.descendant_axis,
+                self.factor_groups)
+
+    def _simple_css_to_xpath(self, css):
+        """Translate ``foo``, ``foo#bar`` and ``foo.bar`` (with an optional
+        type selector) straight from the string, without parsing.
+
+        Return ``None`` for any other selector.
+
+        """
+        match = _el_re.match(css)
+        if match is not None:
+            element = match.group(1)
+            if self.lower_case_element_names:
+                element = element.lower()
+            return element
+        match = _id_re.match(css)
+        if match is not None:
+            template = '%s[@id = %s]'
+            value = match.group(2)
+        else:
+            match = _class_re.match(css)
+            if match is None:
+                return None
+            template = ("%s[@class and contains("
+                        "concat(' ', normalize-space(@class), ' '), %s)]")
+            value = ' %s ' % match.group(2)
+        element = match.group(1)
+        if not element:
+            element = '*'
+        elif self.lower_case_element_names:
+            element = element.lower()
+        return template % (element, self.xpath_literal(value))
 
     def selector_to_xpath(self, selector, prefix='descendant-or-self::',
                           translate_pseudo_elements=False):
@@ -213,6 +626,10 @@ class GenericTranslator(object):
             The equivalent XPath 1.0 expression as an Unicode string.
 
         """
+        xpath = self._selector_to_xpathexpr(selector, translate_pseudo_elements)
+        return _prefixed(xpath, prefix)
+
+    def _selector_to_xpathexpr(self, selector, translate_pseudo_elements):
         tree = getattr(selector, 'parsed_tree', None)
         if not tree:
             raise TypeError('Expected a parsed selector, got %r' % (selector,))
@@ -220,7 +637,73 @@ class GenericTranslator(object):
         assert isinstance(xpath, self.xpathexpr_cls)  # help debug a missing 'return'
         if translate_pseudo_elements and selector.pseudo_element:
             xpath = self.xpath_pseudo_element(xpath, selector.pseudo_element)
-        return (prefix or '') + _unicode(xpath)
+        return xpath
+
+    def _factored_xpathexprs(self, selectors):
+        """Translate *selectors* for :attr:`factor_groups`."""
+        groups = {}
+        keys = []
+        seen = set()
+        for selector in selectors:
+            if selector in seen:
+                continue
+            seen.add(selector)
+            tree = selector.parsed_tree
+            if selector.pseudo_element is not None:
+                key = selector
+            elif isinstance(tree, CombinedSelector):
+                key = (tree.selector, tree.combinator)
+            else:
+                key = None
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = []
+                keys.append(key)
+            group.append(selector)
+        xpaths = []
+        for key in keys:
+            group = groups[key]
+            if len(group) > 1:
+                xpath = self._factor_group(key, group)
+                if xpath is not None:
+                    xpaths.append(xpath)
+                    continue
+            xpaths.extend(self._selector_to_xpathexpr(selector, True)
+                          for selector in group)
+        return xpaths
+
+    def _factor_group(self, key, group):
+        """Translate selectors that only differ by their last compound
+        selector, or return None if they can not be merged."""
+        alternatives = []
+        for selector in group:
+            tree = selector.parsed_tree
+            if key is not None:
+                tree = tree.subselector
+            xpath = self.xpath(tree)
+            if xpath.path:
+                return None
+            if not xpath.never_matches:
+                alternatives.append(xpath)
+        if len(alternatives) <= 1:
+            # Also when nothing can match: keep a step that never matches
+            step = alternatives[0] if alternatives else xpath
+        else:
+            conditions = [xpath.self_condition() for xpath in alternatives]
+            if None in conditions:
+                # In "or", numbers would no longer be positions
+                return None
+            if all(conditions):
+                conditions = ['(%s)' % condition for condition in conditions]
+            else:
+                # One of them matches any element
+                conditions = []
+            step = self.xpathexpr_cls(condition=' or '.join(conditions))
+            step.fold_constants = self.fold_constants
+        if key is None:
+            return step
+        left, combinator = key
+        return self._xpath_combinator(combinator, self.xpath(left), step)
 
     def xpath_pseudo_element(self, xpath, pseudo_element):
         """Translate a pseudo-element.
@@ -247,21 +730,34 @@ class GenericTranslator(object):
 
     def xpath(self, parsed_selector):
         """Translate any parsed selector object."""
-        type_name = type(parsed_selector).__name__
-        method = getattr(self, 'xpath_%s' % type_name.lower(), None)
+        node_type = type(parsed_selector)
+        table = _dispatch_table(type(self), 'node')
+        method = table.get(node_type)
         if method is None:
-            raise ExpressionError('%s is not supported.' %  type_name)
-        return method(parsed_selector)
+            type_name = node_type.__name__
+            method = _find_method(type(self), table, node_type,
+                                  'xpath_%s' % type_name.lower())
+            if method is None:
+                raise ExpressionError('%s is not supported.' %  type_name)
+        return method(self, parsed_selector)
 
 
     # Dispatched by parsed object type
 
     def xpath_combinedselector(self, combined):
         """Translate a combined selector."""
-        combinator = self.combinator_mapping[combined.combinator]
-        method = getattr(self, 'xpath_%s_combinator' % combinator)
-        return method(self.xpath(combined.selector),
-                      self.xpath(combined.subselector))
+        return self._xpath_combinator(combined.combinator,
+                                      self.xpath(combined.selector),
+                                      self.xpath(combined.subselector))
+
+    def _xpath_combinator(self, combinator, left, right):
+        table = _dispatch_table(type(self), 'combinator')
+        method = table.get(combinator)
+        if method is None:
+            method = _find_method(
+                type(self), table, combinator,
+                'xpath_%s_combinator' % self.combinator_mapping[combinator])
+        return method(self, left, right)
 
     def xpath_negation(self, negation):
         xpath = self.xpath(negation.selector)
@@ -274,28 +770,40 @@ class GenericTranslator(object):
 
     def xpath_function(self, function):
         """Translate a functional pseudo-class."""
-        method = 'xpath_%s_function' % function.name.replace('-', '_')
-        method = _unicode_safe_getattr(self, method, None)
-        if not method:
-            raise ExpressionError(
-                "The pseudo-class :%s() is unknown" % function.name)
-        return method(self.xpath(function.selector), function)
+        table = _dispatch_table(type(self), 'function')
+        method = table.get(function.name)
+        if method is None:
+            method = _find_method(
+                type(self), table, function.name,
+                'xpath_%s_function' % function.name.replace('-', '_'))
+            if method is None:
+                raise ExpressionError(
+                    "The pseudo-class :%s() is unknown" % function.name)
+        return method(self, self.xpath(function.selector), function)
 
     def xpath_pseudo(self, pseudo):
         """Translate a pseudo-class."""
-        method = 'xpath_%s_pseudo' % pseudo.ident.replace('-', '_')
-        method = _unicode_safe_getattr(self, method, None)
-        if not method:
-            # TODO: better error message for pseudo-elements?
-            raise ExpressionError(
-                "The pseudo-class :%s is unknown" % pseudo.ident)
-        return method(self.xpath(pseudo.selector))
+        table = _dispatch_table(type(self), 'pseudo')
+        method = table.get(pseudo.ident)
+        if method is None:
+            method = _find_method(
+                type(self), table, pseudo.ident,
+                'xpath_%s_pseudo' % pseudo.ident.replace('-', '_'))
+            if method is None:
+                # TODO: better error message for pseudo-elements?
+                raise ExpressionError(
+                    "The pseudo-class :%s is unknown" % pseudo.ident)
+        return method(self, self.xpath(pseudo.selector))
 
 
     def xpath_attrib(self, selector):
         """Translate an attribute selector."""
-        operator = self.attribute_operator_mapping[selector.operator]
-        method = getattr(self, 'xpath_attrib_%s' % operator)
+        table = _dispatch_table(type(self), 'attrib')
+        method = table.get(selector.operator)
+        if method is None:
+            operator = self.attribute_operator_mapping[selector.operator]
+            method = _find_method(type(self), table, selector.operator,
+                                  'xpath_attrib_%s' % operator)
         if self.lower_case_attribute_names:
             name = selector.attrib.lower()
         else:
@@ -314,7 +822,7 @@ class GenericTranslator(object):
             value = selector.value.value.lower()
         else:
             value = selector.value.value
-        return method(self.xpath(selector.selector), attrib, value)
+        return method(self, self.xpath(selector.selector), attrib, value)
 
     def xpath_class(self, class_selector):
         """Translate a class selector."""
@@ -344,6 +852,8 @@ class GenericTranslator(object):
             element = '%s:%s' % (selector.namespace, element)
             safe = safe and is_safe_name(selector.namespace)
         xpath = self.xpathexpr_cls(element=element)
+        if self.fold_constants:
+            xpath.fold_constants = True
         if not safe:
             xpath.add_name_test()
         return xpath
@@ -353,6 +863,8 @@ class GenericTranslator(object):
 
     def xpath_descendant_combinator(self, left, right):
         """right is a child, grand-child or further descendant of left"""
+        if self.descendant_axis:
+            return left.join('/descendant::', right)
         return left.join('/descendant-or-self::*/', right)
 
     def xpath_child_combinator(self, left, right):
@@ -361,9 +873,7 @@ class GenericTranslator(object):
 
     def xpath_direct_adjacent_combinator(self, left, right):
         """right is a sibling immediately after left"""
-        xpath = left.join('/following-sibling::', right)
-        xpath.add_name_test()
-        return xpath.add_condition('position() = 1')
+        return left.join('/following-sibling::*[1]/self::', right)
 
     def xpath_indirect_adjacent_combinator(self, left, right):
         """right is a sibling after left, immediately or not"""
@@ -455,7 +965,9 @@ class GenericTranslator(object):
         # ~~~~~~~~~~
         #    count(***-sibling::***) = b-1
         if a == 0:
-            return xpath.add_condition('%s = %s' % (siblings_count, b_min_1))
+            return xpath.add_condition(self._sibling_condition(
+                '%s = %s' % (siblings_count, b_min_1),
+                a, b, last, not add_name_test))
 
         expr = []
 
@@ -497,9 +1009,46 @@ class GenericTranslator(object):
 
             expr.append('%s mod %s = 0' % (left, a))
 
-        xpath.add_condition(' and '.join(expr))
+        xpath.add_condition(self._sibling_condition(
+            ' and '.join(expr), a, b, last, not add_name_test))
         return xpath
 
+    def _sibling_condition(self, condition, a, b, last, of_type):
+        """Return *condition*, with its positional form for the
+        an+b-th element if :attr:`positional_predicates` is set."""
+        if not self.positional_predicates:
+            return condition
+        if last:
+            position = '(last() - position() + 1)'
+        else:
+            position = 'position()'
+        if a == 0:
+            # A number alone in the first predicate is a position
+            if not last:
+                positional = '%s' % b
+            elif b < 1:
+                positional = '0'
+            elif b == 1:
+                positional = 'last()'
+            else:
+                positional = 'last() - %s' % (b - 1)
+        else:
+            expr = []
+            if a > 0:
+                if b > 1:
+                    expr.append('%s >= %s' % (position, b))
+            else:
+                expr.append('%s <= %s' % (position, b))
+            if abs(a) != 1:
+                offset = -b % abs(a)
+                if offset:
+                    left = '(%s +%s)' % (position, offset)
+                else:
+                    left = position
+                expr.append('%s mod %s = 0' % (left, abs(a)))
+            positional = ' and '.join(expr)
+        return _SiblingCondition(condition, positional, of_type)
+
     def xpath_nth_last_child_function(self, xpath, function):
         return self.xpath_nth_child_function(xpath, function, last=True)
 
@@ -552,31 +1101,45 @@ class GenericTranslator(object):
         return xpath.add_condition("1")
 
     def xpath_first_child_pseudo(self, xpath):
-        return xpath.add_condition('count(preceding-sibling::*) = 0')
+        return xpath.add_condition(self._sibling_condition(
+            'count(preceding-sibling::*) = 0', 0, 1, False, False))
 
     def xpath_last_child_pseudo(self, xpath):
-        return xpath.add_condition('count(following-sibling::*) = 0')
+        return xpath.add_condition(self._sibling_condition(
+            'count(following-sibling::*) = 0', 0, 1, True, False))
 
     def xpath_first_of_type_pseudo(self, xpath):
         if xpath.element == '*':
             raise ExpressionError(
                 "*:first-of-type is not implemented")
-        return xpath.add_condition('count(preceding-sibling::%s) = 0' % xpath.element)
+        return xpath.add_condition(self._sibling_condition(
+            'count(preceding-sibling::%s) = 0' % xpath.element,
+            0, 1, False, True))
 
     def xpath_last_of_type_pseudo(self, xpath):
         if xpath.element == '*':
             raise ExpressionError(
                 "*:last-of-type is not implemented")
-        return xpath.add_condition('count(following-sibling::%s) = 0' % xpath.element)
+        return xpath.add_condition(self._sibling_condition(
+            'count(following-sibling::%s) = 0' % xpath.element,
+            0, 1, True, True))
 
     def xpath_only_child_pseudo(self, xpath):
-        return xpath.add_condition('count(parent::*/child::*) = 1')
+        condition = 'count(parent::*/child::*) = 1'
+        if self.positional_predicates:
+            condition = _SiblingCondition(
+                condition, 'last() = 1 and parent::*', False)
+        return xpath.add_condition(condition)
 
     def xpath_only_of_type_pseudo(self, xpath):
         if xpath.element == '*':
             raise ExpressionError(
                 "*:only-of-type is not implemented")
-        return xpath.add_condition('count(parent::*/child::%s) = 1' % xpath.element)
+        condition = 'count(parent::*/child::%s) = 1' % xpath.element
+        if self.positional_predicates:
+            condition = _SiblingCondition(
+                condition, 'last() = 1 and parent::*', True)
+        return xpath.add_condition(condition)
 
     def xpath_empty_pseudo(self, xpath):
         return xpath.add_condition("not(*) and not(string-length())")
@@ -687,6 +1250,9 @@ class HTMLTranslator(GenericTranslator):
             self.lower_case_element_names = True
             self.lower_case_attribute_names = True
 
+    def config_key(self):
+        return super(HTMLTranslator, self).config_key() + (self.xhtml,)
+
     def xpath_checked_pseudo(self, xpath):
         # FIXME: is this really all the elements?
         return xpath.add_condition(
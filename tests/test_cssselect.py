@@ -17,15 +17,28 @@
 
 """
 
+import gc
 import sys
 import unittest
+import weakref
+from io import BytesIO
+from xml.etree import ElementTree
 
 from lxml import etree, html
 from cssselect import (parse, GenericTranslator, HTMLTranslator,
                        SelectorSyntaxError, ExpressionError)
 from cssselect.parser import (tokenize, parse_series, _unicode,
-                              FunctionalPseudoElement)
-from cssselect.xpath import _unicode_safe_getattr, XPathExpr
+                              FunctionalPseudoElement, set_parse_cache,
+                              get_parse_cache, parse_selector_group,
+                              TokenStream, _parse_fast, SelectorInterner,
+                              specificities)
+from cssselect.matching import (GenericMatcher, HTMLMatcher, SelectorSet,
+                                select)
+from cssselect.adapters import ElementTreeAdapter
+from cssselect.bloom import AncestorFilter
+from cssselect.streaming import StreamMatcher, iterselect
+from cssselect.xpath import (_unicode_safe_getattr, XPathExpr,
+                             set_translation_cache, get_translation_cache)
 
 
 if sys.version_info[0] < 3:
@@ -63,6 +76,34 @@ class TestCssselect(unittest.TestCase):
             "<DELIM ')' at 41>",
             "<EOF at 42>",
         ]
+        tokens = [
+            _unicode(item) for item in tokenize(r'#a\41 b.c/* open')]
+        assert tokens == [
+            "<HASH 'aAb' at 0>",
+            "<DELIM '.' at 7>",
+            "<IDENT 'c' at 8>",
+            "<EOF at 16>",
+        ]
+
+        stream = TokenStream(tokenize('a b'))
+        assert stream.next() == ('IDENT', 'a')
+        assert stream.peek() == ('S', ' ')
+        assert stream.used == [('IDENT', 'a')]
+        stream.skip_whitespace()
+        assert stream.next_ident() == 'b'
+        assert stream.peek().type == 'EOF'
+        assert len(stream.used) == stream.index == 3
+
+        comma, eof = list(tokenize(','))
+        assert comma == ('DELIM', ',') and not comma != ('DELIM', ',')
+        assert comma != ('DELIM', '.') and comma != ('DELIM', ',', 0)
+        assert comma in (('EOF', None), ('DELIM', ','))
+        assert eof == ('EOF', None) and eof != comma
+        assert (comma.type, comma.value, comma.pos) == ('DELIM', ',', 0)
+        assert tuple(comma) == ('DELIM', ',') and comma[1] == ','
+        assert hash(comma) == hash(('DELIM', ','))
+        assert comma.is_delim('.', ',') and not eof.is_delim(',')
+        assert not hasattr(comma, '__dict__')
 
     def test_parser(self):
         def repr_parse(css):
@@ -162,6 +203,84 @@ class TestCssselect(unittest.TestCase):
             'Hash[Element[*]#foo]] <followed> Hash[Element[*]#bar]]'
         ]
 
+    def test_parsed_objects_have_slots(self):
+        def walk(tree):
+            yield tree
+            for name in ('selector', 'subselector'):
+                if hasattr(tree, name):
+                    for node in walk(getattr(tree, name)):
+                        yield node
+
+        selector, = parse('a#b.c[d=e]:not(f) > g:nth-child(2):empty::h(i)')
+        nodes = [selector, selector.pseudo_element]
+        nodes.extend(walk(selector.parsed_tree))
+        assert len(set(type(node) for node in nodes)) == 10
+        for node in nodes:
+            assert not hasattr(node, '__dict__'), node
+
+    def test_parsed_objects_are_values(self):
+        css = 'a#b.c[d=e]:not(f) > g:nth-child(2):empty::h(i)'
+        first, = parse(css)
+        second, = parse('  ' + css)
+        assert first is not second
+        assert first == second and not first != second
+        # Like lists, mutable objects are not hashable
+        self.assertRaises(TypeError, hash, first)
+        assert first.parsed_tree.subselector == parse('g:nth-child(2):empty')[
+            0].parsed_tree
+        assert parse('.a') != parse('#a')
+        assert parse('.a')[0] != parse('.a')[0].parsed_tree
+        assert parse('a::b') != parse('a::c')
+        assert parse('a[b="c"]') == parse("a[b='c']") != parse('a[b=c]')
+        assert len(set(parse('a, a, b, a', immutable=True))) == 2
+
+        # Parsed objects can be modified, unless they are frozen
+        third, = parse(css)
+        assert not third.frozen
+        third.parsed_tree.subselector.selector.selector.element = 'b'
+        assert third.canonical() == (
+            'a#b.c[d=e]:not(f) > b:nth-child(2):empty::h(i)')
+        assert third != first
+        del third.pseudo_element
+        third.pseudo_element = 'before'
+        assert third.specificity() == (1, 4, 4)
+
+        assert first.freeze() is first
+        assert first.frozen and first.parsed_tree.subselector.frozen
+        assert first.pseudo_element.frozen
+        self.assertRaises(AttributeError, setattr, first, 'pseudo_element', 'x')
+        self.assertRaises(AttributeError, delattr, first, 'parsed_tree')
+        self.assertRaises(AttributeError, setattr, first.parsed_tree,
+                          'selector', None)
+        assert first.pseudo_element.name == 'h'
+        second.freeze()
+        assert first == second and hash(first) == hash(second)
+        assert {first: 1}[second] == 1
+        frozen, = parse(css, immutable=True)
+        assert frozen.frozen and frozen == first
+
+        import copy
+        import pickle
+        assert copy.deepcopy(first) == first
+        assert pickle.loads(pickle.dumps(first)) == first
+        assert repr(pickle.loads(pickle.dumps(first))) == repr(first)
+
+    def test_selector_interner(self):
+        interner = SelectorInterner()
+        selectors = [interner.intern(selector) for selector in
+                     parse('div.product, div.product > a, span.product')]
+        first, second, third = selectors
+        assert second.parsed_tree.selector is first.parsed_tree
+        assert (third.parsed_tree.selector is not
+                first.parsed_tree.selector)
+        assert interner.intern(parse('div.product')[0]) is first
+        assert repr(selectors) == repr(
+            parse('div.product, div.product > a, span.product'))
+        assert len(interner) == 9
+        interner.clear()
+        assert len(interner) == 0
+        assert interner.intern(parse('div.product')[0]) is not first
+
     def test_pseudo_elements(self):
         def parse_pseudo(css):
             result = []
@@ -274,6 +393,29 @@ class TestCssselect(unittest.TestCase):
         assert specificity('#lorem + foo#ipsum:first-child > bar:first-line'
             ) == (2, 1, 3)
 
+        selectors = parse('#lorem + foo#ipsum:first-child > bar:first-line,'
+                          ':not(#foo), *, foo:empty::before')
+        assert specificities(selectors) == [
+            (2, 1, 3), (1, 0, 0), (0, 0, 0), (0, 1, 2)]
+        assert specificities(selectors) == [
+            selector.specificity() for selector in selectors]
+        assert specificities([]) == []
+
+        # Deep selectors would hit the recursion limit without caching
+        deep, = parse(' > '.join(['a.b'] * 3000))
+        assert specificities([deep]) == [(0, 3000, 3000)]
+        # Values are only cached on immutable objects
+        assert deep._cached is None
+        deep.freeze()
+        assert specificities([deep]) == [(0, 3000, 3000)]
+        assert deep.specificity() == (0, 3000, 3000)
+        assert deep.canonical() == ' > '.join(['a.b'] * 3000)
+
+        selector, = parse('a::foo(2)', immutable=True)
+        assert specificities([selector]) == [(0, 0, 2)]
+        assert selector.pseudo_element._cached == ('foo(2)', (0, 0, 1))
+        assert FunctionalPseudoElement('x', [])._cached is None
+
     def test_css_export(self):
         def css2css(css, res=None):
             selectors = parse(css)
@@ -307,6 +449,11 @@ class TestCssselect(unittest.TestCase):
         css2css('#lorem + foo#ipsum:first-child > bar::first-line')
         css2css('foo > *')
 
+        selector = parse(
+            '#lorem + foo#ipsum:first-child > bar::first-line')[0].freeze()
+        assert selector.canonical() is selector.canonical()
+        assert selector.specificity() is selector.specificity()
+
     def test_parse_errors(self):
         def get_error(css):
             try:
@@ -361,6 +508,8 @@ class TestCssselect(unittest.TestCase):
             "Expected an argument, got <EOF at 8>")
         assert get_error(':contains("foo') == (
             "Unclosed string at 10")
+        assert get_error(':contains("foo\nbar")') == (
+            "Invalid string at 10")
         assert get_error('foo!') == (
             "Expected selector, got <DELIM '!' at 3>")
 
@@ -379,8 +528,75 @@ class TestCssselect(unittest.TestCase):
         assert get_error('div :scope header') == (
             'Got immediate child pseudo-element ":scope" not at the start of a selector'
         )
+        assert get_error('div *:SCOPE') == (
+            'Got immediate child pseudo-element ":scope" not at the start of a selector'
+        )
+        assert get_error('div ns|*:scope') is None
         assert get_error('> div p') == ("Expected selector, got <DELIM '>' at 0>")
 
+    def test_parse_fast_path(self):
+        def slow_parse(css):
+            return list(parse_selector_group(TokenStream(tokenize(css))))
+
+        def both(css):
+            fast = _parse_fast(css)
+            assert fast is not None, css
+            slow = slow_parse(css)
+            assert repr(fast) == repr(slow)
+            assert [s.canonical() for s in fast] == [
+                s.canonical() for s in slow]
+            return repr(fast[0].parsed_tree)
+
+        assert both('div.a.b') == 'Class[Class[Element[div].a].b]'
+        assert both('a[href]') == 'Attrib[Element[a][href]]'
+        assert both('meta[property="og:title"]') == (
+            "Attrib[Element[meta][property = 'og:title']]")
+        assert both("a[ rel |= 'en' ]") == "Attrib[Element[a][rel |= 'en']]"
+        assert both('a[rel!=nofollow]') == (
+            "Attrib[Element[a][rel != 'nofollow']]")
+        assert both('ul > li') == (
+            'CombinedSelector[Element[ul] > Element[li]]')
+        assert both(' .a .b ') == (
+            'CombinedSelector[Class[Element[*].a] '
+                '<followed> Class[Element[*].b]]')
+        assert both('h2+p~*#x') == (
+            'CombinedSelector[CombinedSelector[Element[h2] + Element[p]] '
+                '~ Hash[Element[*]#x]]')
+        assert both('h1#-x._y[data-z]') == (
+            'Attrib[Class[Hash[Element[h1]#-x]._y][data-z]]')
+
+        # Everything else goes through the tokenizer
+        for css in ['div, p', 'a:hover', 'a::text', 'ns|a', '[ns|a]',
+                    r'.a\41', u('.é'), 'a /* x */', 'a >', '> a', '',
+                    '[a="b\\"]', '[a=1]', '[a ^ = b]', '.1', '--a']:
+            assert _parse_fast(css) is None, css
+
+    def test_parse_cache(self):
+        assert get_parse_cache() is None
+        cache = set_parse_cache(2)
+        try:
+            assert get_parse_cache() is cache
+            first = parse('div > p, a')
+            second = parse('div > p, a')
+            assert first == second
+            assert first is not second
+            assert [a is b for a, b in zip(first, second)] == [True, True]
+            assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 0)
+            parse('a')
+            parse('b')
+            assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+            assert len(cache) == 2
+            assert 'div > p, a' not in cache
+            self.assertRaises(SelectorSyntaxError, parse, 'div >')
+            assert 'div >' not in cache
+            cache.clear()
+            assert len(cache) == 0
+            assert cache.info() == {'hits': 0, 'misses': 0, 'evictions': 0,
+                                    'size': 0, 'maxsize': 2}
+        finally:
+            set_parse_cache(None)
+        assert get_parse_cache() is None
+
     def test_translation(self):
         def xpath(css):
             return _unicode(GenericTranslator().css_to_xpath(css, prefix=''))
@@ -497,7 +713,13 @@ class TestCssselect(unittest.TestCase):
         assert xpath('e > f') == (
             "e/f")
         assert xpath('e + f') == (
-            "e/following-sibling::*[name() = 'f' and (position() = 1)]")
+            "e/following-sibling::*[1]/self::f")
+        assert xpath('e + ns|f') == (
+            "e/following-sibling::*[1]/self::ns:f")
+        assert xpath('e:not(f)') == (
+            "e[not(self::f)]")
+        assert xpath('e:not(ns|f)') == (
+            "e[not(self::ns:f)]")
         assert xpath('e ~ f') == (
             "e/following-sibling::f")
         assert xpath('e ~ f:nth-child(3)') == (
@@ -530,6 +752,356 @@ class TestCssselect(unittest.TestCase):
         self.assertRaises(TypeError, GenericTranslator().selector_to_xpath,
             'foo')
 
+    def test_css_to_xpath_fast_path(self):
+        def full(translator, css, prefix):
+            return ' | '.join(
+                translator.selector_to_xpath(selector, prefix)
+                for selector in parse(css))
+
+        for translator in [GenericTranslator(), HTMLTranslator(),
+                           HTMLTranslator(xhtml=True)]:
+            for css in ['div', ' DiV ', '#foo', 'Div#foo-1', '.bar',
+                        'SPAN.bar_2', 'div > p', 'h1', 'div:first-child']:
+                for prefix in ['descendant-or-self::', '', None, 'x/']:
+                    assert translator.css_to_xpath(css, prefix) == full(
+                        translator, css, prefix), (translator, css, prefix)
+
+        assert HTMLTranslator().css_to_xpath('DIV.Foo', prefix='') == (
+            "div[@class and contains("
+            "concat(' ', normalize-space(@class), ' '), ' Foo ')]")
+        assert HTMLTranslator(xhtml=True).css_to_xpath('DIV', prefix='') == (
+            "DIV")
+
+        # Sub-classes that customize the translation do not use the fast path
+        class IDTranslator(GenericTranslator):
+            def xpath_hash(self, id_selector):
+                xpath = self.xpath(id_selector.selector)
+                return self.xpath_attrib_equals(
+                    xpath, '@xml:id', id_selector.id)
+
+        assert IDTranslator().css_to_xpath('#foo', prefix='') == (
+            "*[@xml:id = 'foo']")
+        assert IDTranslator().css_to_xpath('div', prefix='') == 'div'
+
+    def test_translation_cache(self):
+        class IDTranslator(GenericTranslator):
+            id_attribute = 'xml:id'
+
+            def xpath_hash(self, id_selector):
+                xpath = self.xpath(id_selector.selector)
+                return self.xpath_attrib_equals(
+                    xpath, '@' + self.id_attribute, id_selector.id)
+
+        assert get_translation_cache() is None
+        cache = set_translation_cache(10)
+        try:
+            assert get_translation_cache() is cache
+            generic = GenericTranslator()
+            assert generic.css_to_xpath('DIV#foo', '') == "DIV[@id = 'foo']"
+            assert generic.css_to_xpath('DIV#foo', '') == "DIV[@id = 'foo']"
+            assert (cache.hits, cache.misses) == (1, 1)
+            assert GenericTranslator().css_to_xpath('DIV#foo', '') == (
+                "DIV[@id = 'foo']")
+            assert (cache.hits, cache.misses) == (2, 1)
+
+            # Different prefixes, settings or classes do not share entries
+            assert generic.css_to_xpath('DIV#foo') == (
+                "descendant-or-self::DIV[@id = 'foo']")
+            assert HTMLTranslator().css_to_xpath('DIV#foo', '') == (
+                "div[@id = 'foo']")
+            assert HTMLTranslator(xhtml=True).css_to_xpath('DIV#foo', '') == (
+                "DIV[@id = 'foo']")
+            assert IDTranslator().css_to_xpath('DIV#foo', '') == (
+                "DIV[@xml:id = 'foo']")
+            assert (cache.hits, cache.misses) == (2, 5)
+            assert len(cache) == 5
+
+            generic.lower_case_element_names = True
+            assert generic.css_to_xpath('DIV#foo', '') == "div[@id = 'foo']"
+            assert (cache.hits, cache.misses) == (2, 6)
+
+            self.assertRaises(SelectorSyntaxError,
+                              generic.css_to_xpath, 'div >')
+            self.assertRaises(ExpressionError,
+                              generic.css_to_xpath, 'div::before')
+            assert len(cache) == 6
+        finally:
+            set_translation_cache(None)
+        assert get_translation_cache() is None
+
+    def test_dispatch_tables(self):
+        class FooTranslator(GenericTranslator):
+            combinator_mapping = dict(
+                GenericTranslator.combinator_mapping, **{'+': 'foo'})
+
+            def xpath_foo_combinator(self, left, right):
+                return left.join('/foo::', right)
+
+            def xpath_foo_pseudo(self, xpath):
+                return xpath.add_condition('foo')
+
+            def xpath_first_child_pseudo(self, xpath):
+                return xpath.add_condition('first')
+
+        generic = GenericTranslator()
+        foo = FooTranslator()
+        css = 'a + b:first-child'
+        assert generic.css_to_xpath(css, '') == (
+            "a/following-sibling::*[1]/self::b"
+            "[count(preceding-sibling::*) = 0]")
+        assert foo.css_to_xpath(css, '') == 'a/foo::b[first]'
+        assert generic.css_to_xpath(css, '') == (
+            "a/following-sibling::*[1]/self::b"
+            "[count(preceding-sibling::*) = 0]")
+        assert foo.css_to_xpath('a:foo', '') == 'a[foo]'
+        # Unknown names fail every time, not only the first one
+        for i in range(2):
+            self.assertRaises(ExpressionError,
+                              generic.css_to_xpath, 'a:foo')
+            self.assertRaises(ExpressionError,
+                              generic.css_to_xpath, 'a:foo()')
+
+        # Tables belong to their class, which can be garbage-collected
+        assert '_dispatch_tables' in FooTranslator.__dict__
+        assert (FooTranslator.__dict__['_dispatch_tables'] is not
+                GenericTranslator.__dict__['_dispatch_tables'])
+        reference = weakref.ref(FooTranslator)
+        del FooTranslator, foo
+        gc.collect()
+        assert reference() is None
+
+    def test_xpath_expr(self):
+        xpath = XPathExpr('', 'e')
+        assert not hasattr(xpath, '__dict__')
+        assert str(xpath) == 'e'
+        xpath.add_condition('@a').add_condition('@b or @c')
+        assert xpath.condition == '@a and (@b or @c)'
+        xpath.add_star_prefix()
+        xpath.join('/', XPathExpr('', 'f', '@d'))
+        assert str(xpath) == '*/e[@a and (@b or @c)]/f[@d]'
+        assert xpath.path == '*/e[@a and (@b or @c)]/'
+        assert (xpath.element, xpath.condition) == ('f', '@d')
+        xpath.join('/', XPathExpr('*/'))
+        assert str(xpath) == '*/e[@a and (@b or @c)]/f[@d]/*'
+        xpath.path = 'x/'
+        xpath.condition = ''
+        assert str(xpath) == 'x/*'
+        assert repr(xpath) == 'XPathExpr[x/*]'
+
+        long_selector = ' > '.join(['a.b'] * 200)
+        step = ("a[@class and contains("
+                "concat(' ', normalize-space(@class), ' '), ' b ')]")
+        assert GenericTranslator().css_to_xpath(long_selector, '') == (
+            '/'.join([step] * 200))
+
+    def test_xpath_expr_subclass(self):
+        class UpperXPathExpr(XPathExpr):
+            def __str__(self):
+                return XPathExpr.__str__(self).upper()
+
+        class UpperTranslator(GenericTranslator):
+            xpathexpr_cls = UpperXPathExpr
+
+        # The left-hand side of joins is rendered by the sub-class
+        assert UpperTranslator().css_to_xpath('a > b.c > d', prefix='') == (
+            "A/B[@CLASS AND CONTAINS(CONCAT(' ', NORMALIZE-SPACE(@CLASS), "
+            "' '), ' C ')]/D")
+
+        # Like parsel: the prefix is not rendered by __str__
+        class TextXPathExpr(XPathExpr):
+            textnode = False
+
+            def __str__(self):
+                path = XPathExpr.__str__(self)
+                if self.textnode:
+                    if path == '*':
+                        return 'text()'
+                    return path + '/text()'
+                return path
+
+        class TextTranslator(GenericTranslator):
+            xpathexpr_cls = TextXPathExpr
+            positional_predicates = True
+
+            def xpath_pseudo_element(self, xpath, pseudo_element):
+                assert pseudo_element == 'text'
+                xpath.textnode = True
+                return xpath
+
+        def text_xpath(css, prefix='descendant-or-self::'):
+            return TextTranslator().css_to_xpath(css, prefix)
+
+        assert text_xpath('::text') == 'descendant-or-self::text()'
+        assert text_xpath('a::text') == 'descendant-or-self::a/text()'
+        assert text_xpath('a:first-child') == (
+            'descendant-or-self::a[count(preceding-sibling::*) = 0]')
+        assert text_xpath('a:first-child', prefix='') == '*[1][self::a]'
+
+        class FoldingTranslator(GenericTranslator):
+            fold_constants = True
+
+        xpath = FoldingTranslator().xpath(parse('a.b:hover')[0].parsed_tree)
+        assert xpath.never_matches
+        copy = XPathExpr(xpath.path, xpath.element, xpath.condition,
+                         never_matches=xpath.never_matches,
+                         fold_constants=xpath.fold_constants)
+        assert copy.never_matches and copy.fold_constants
+
+    def test_fold_constants(self):
+        class FoldingTranslator(HTMLTranslator):
+            fold_constants = True
+
+        def xpath(css):
+            return HTMLTranslator().css_to_xpath(css, prefix='')
+
+        def folded(css):
+            return FoldingTranslator().css_to_xpath(css, prefix='')
+
+        def xpath_list(css):
+            return FoldingTranslator().css_to_xpath_list(css, prefix='')
+
+        assert xpath('e:scope[x]') == 'e[1 and (@x)]'
+        assert folded('e:scope[x]') == 'e[@x]'
+        assert folded(':scope > e') == '*[1]/e'
+        assert folded(':scope') == '*[1]'
+        assert xpath('e:not(:hover)') == 'e[not(0)]'
+        assert folded('e:not(:hover)') == 'e'
+        assert folded('e:not(:hover):not(:focus)') == 'e'
+        assert folded('e[x]:hover[y] > f') == 'e[0]/f'
+        assert folded('e:not(*)') == 'e[0]'
+        assert xpath('e[x^=""], f') == 'e[0] | f'
+        assert folded('e[x^=""], f') == 'f'
+        assert folded('e:hover, f:hover') == 'e[0]'
+        assert folded('e, f') == 'e | f'
+
+        assert xpath_list('e[x^=""], f:hover g, h') == ['h']
+        assert xpath_list('e:hover, f:hover') == []
+        assert xpath_list('e') == ['e']
+        assert xpath_list('e:not(:hover)') == ['e']
+        assert HTMLTranslator().css_to_xpath_list('e:scope[x], f:hover') == [
+            'descendant-or-self::e[1 and (@x)]']
+
+    def test_positional_predicates(self):
+        class PositionalTranslator(GenericTranslator):
+            positional_predicates = True
+
+        def xpath(css, prefix=''):
+            return PositionalTranslator().css_to_xpath(css, prefix)
+
+        assert xpath('tr:nth-child(2n)') == '*[position() mod 2 = 0][self::tr]'
+        assert xpath('table > tr:first-child') == 'table/*[1][self::tr]'
+        assert xpath('table tr:last-of-type[x]') == (
+            'table/descendant-or-self::*/tr[last()][@x]')
+        assert xpath('li:only-child') == (
+            '*[last() = 1 and parent::*][self::li]')
+        assert xpath('li:nth-child(3)') == '*[3][self::li]'
+        assert xpath('li:nth-last-child(3)') == '*[last() - 2][self::li]'
+        assert xpath('ul > li:nth-of-type(-n+2)') == (
+            'ul/li[position() <= 2]')
+        assert xpath('*:nth-child(3n+2)') == (
+            '*[position() >= 2 and (position() +1) mod 3 = 0]')
+        assert xpath('li:nth-last-child(2n)') == (
+            '*[(last() - position() + 1) mod 2 = 0][self::li]')
+        # Only the first one is positional
+        assert xpath('li:first-child:last-child') == (
+            '*[1][self::li and (count(following-sibling::*) = 0)]')
+        assert xpath('li:first-child', '//') == '//*[1][self::li]'
+
+        # Not on the child axis
+        assert xpath('li:first-child', 'descendant-or-self::') == (
+            'descendant-or-self::li[count(preceding-sibling::*) = 0]')
+        assert xpath('a ~ li:last-child') == (
+            'a/following-sibling::li[count(following-sibling::*) = 0]')
+        assert xpath('li:first-child > a', 'descendant-or-self::') == (
+            'descendant-or-self::li[count(preceding-sibling::*) = 0]/a')
+        assert xpath('li:not(:first-child)') == (
+            'li[not(count(preceding-sibling::*) = 0)]')
+        assert GenericTranslator().css_to_xpath('ul > li:first-child', '') == (
+            'ul/li[count(preceding-sibling::*) = 0]')
+
+        document = etree.fromstring(
+            '<ul><li id="1"/><p id="2"/><li id="3"/><li id="4"/></ul>')
+        for css in ['li:nth-child(2n+1)', 'li:nth-of-type(2)', 'p:only-of-type',
+                    'li:last-child', 'ul > :nth-last-child(-n+3)',
+                    'li:nth-last-of-type(n+2)', ':only-child']:
+            for prefix in ['//', 'descendant-or-self::*/', '']:
+                assert document.xpath(xpath(css, prefix)) == document.xpath(
+                    GenericTranslator().css_to_xpath(css, prefix)), css
+
+    def test_descendant_axis(self):
+        class DescendantTranslator(GenericTranslator):
+            descendant_axis = True
+
+        class PositionalTranslator(DescendantTranslator):
+            positional_predicates = True
+
+        assert DescendantTranslator().css_to_xpath('a b > c d.e') == (
+            "descendant-or-self::a/descendant::b/c/descendant::d"
+            "[@class and contains(concat(' ', normalize-space(@class), ' '), "
+            "' e ')]")
+        assert DescendantTranslator().css_to_xpath('a b:first-child') == (
+            'descendant-or-self::a/descendant::b'
+            '[count(preceding-sibling::*) = 0]')
+        # Positions are among siblings: step through their parent
+        assert PositionalTranslator().css_to_xpath('a b:first-child c') == (
+            'descendant-or-self::a//*[1][self::b]/descendant::c')
+
+        document = etree.fromstring(
+            '<a><b id="1"><b id="2"><c id="3"/><b id="4"/></b></b>'
+            '<c id="5"><b id="6"/></c></a>')
+        for css in ['a b', 'b b', 'a b c', 'b > b', 'b b:first-child',
+                    'a :nth-child(2)', 'c ~ b', 'a :not(b) b', 'b *']:
+            expected = document.xpath(GenericTranslator().css_to_xpath(css))
+            for translator in [DescendantTranslator(), PositionalTranslator()]:
+                assert document.xpath(translator.css_to_xpath(css)) == (
+                    expected), css
+            assert expected, css
+
+    def test_factor_groups(self):
+        class FactoringTranslator(GenericTranslator):
+            factor_groups = True
+
+        def xpath(css):
+            return FactoringTranslator().css_to_xpath(css, '')
+
+        assert xpath('a > b, a > c:first-child, a > [x]') == (
+            "a/*[(self::b) or "
+            "(self::c and (count(preceding-sibling::*) = 0)) or (@x)]")
+        assert xpath('a b, a b, c') == (
+            'a/descendant-or-self::*/b | c')
+        assert xpath('a, b, a') == '*[(self::a) or (self::b)]'
+        assert xpath('p + a, p + b') == (
+            'p/following-sibling::*[1]/self::*[(self::a) or (self::b)]')
+        # Any element matches
+        assert xpath('a > b, a > *') == 'a/*'
+        # Only the last compound selector can differ
+        assert xpath('a > b, a c, d > b') == (
+            'a/b | a/descendant-or-self::*/c | d/b')
+        # Alternatives that never match are left out
+        assert xpath('a b, a b:hover') == 'a/descendant-or-self::*/b'
+
+        class FoldingTranslator(FactoringTranslator):
+            fold_constants = True
+
+        assert FoldingTranslator().css_to_xpath('a :hover, a b:hover') == (
+            'descendant-or-self::a/descendant-or-self::*/b[0]')
+
+        document = etree.fromstring(
+            '<a><b id="1"/><c id="2" x=""><b id="3"/></c><d id="4"/></a>')
+        for css in ['a > b, a > c, a > d', 'a b, a [x], a c', 'c, b, c',
+                    'b ~ d, b ~ c, b ~ *', 'c > b, a > b']:
+            assert document.xpath(xpath(css)) == document.xpath(
+                GenericTranslator().css_to_xpath(css, '')), css
+
+        # "1" from :scope is a position, not a boolean in "or"
+        document = etree.fromstring('<r><a/><b/><c><b/></c></r>')
+        for translator in [GenericTranslator(), FactoringTranslator(),
+                           FoldingTranslator()]:
+            xpath = translator.css_to_xpath(':scope, b')
+            assert xpath == (
+                'descendant-or-self::*[1] | descendant-or-self::b')
+            assert [e.tag for e in document.xpath(xpath)] == ['r', 'b', 'b']
+
     def test_unicode(self):
         if sys.version_info[0] < 3:
             css = '.a\xc1b'.decode('ISO-8859-1')
@@ -693,14 +1265,31 @@ class TestCssselect(unittest.TestCase):
         ).__getitem__
         css_to_xpath = GenericTranslator().css_to_xpath
         html_css_to_xpath = HTMLTranslator().css_to_xpath
+        matcher = GenericMatcher()
+        html_matcher = HTMLMatcher()
+        et_document = ElementTree.fromstring(HTML_IDS)
+        et_adapter = ElementTreeAdapter(et_document)
+        et_matcher = GenericMatcher(adapter=et_adapter)
+        et_html_matcher = HTMLMatcher(adapter=et_adapter)
+        filtered_matcher = GenericMatcher()
+        filtered_matcher.ancestor_filter = True
 
         def select_ids(selector, html_only):
             xpath = css_to_xpath(selector)
             items = document.xpath(xpath)
+            # The matcher gives the same results, without XPath
+            assert matcher.select(document, selector) == items
+            assert filtered_matcher.select(document, selector) == items
+            et_items = et_matcher.select(et_document, selector)
             if html_only:
                 assert items == []
                 xpath = html_css_to_xpath(selector)
                 items = document.xpath(xpath)
+                assert html_matcher.select(document, selector) == items
+                et_items = et_html_matcher.select(et_document, selector)
+            # ... and on an ElementTree tree
+            assert ([element.get('id') for element in et_items] ==
+                    [element.get('id') for element in items])
             items.sort(key=sort_key)
             return [element.get('id', 'nil') for element in items]
 
@@ -859,10 +1448,265 @@ class TestCssselect(unittest.TestCase):
         assert pcss(':checked', html_only=True) == [
             'checkbox-checked', 'checkbox-disabled-checked']
 
+    def test_compiled_xpath(self):
+        from cssselect.compiled import XPathCache, compile_xpath, select
+        import threading
+
+        document = html.document_fromstring(HTML_SHAKESPEARE)
+        body = document.xpath('//body')[0]
+        assert len(select(body, 'div.dialog')) == 51
+        assert select(body, 'div.dialog') == body.xpath(
+            GenericTranslator().css_to_xpath('div.dialog'))
+        assert compile_xpath('div') is compile_xpath('div')
+        assert compile_xpath('div') is not compile_xpath(
+            'div', smart_strings=False)
+        assert compile_xpath('DIV') is not compile_xpath(
+            'DIV', HTMLTranslator())
+        assert select(body, 'DIV', HTMLTranslator()) == select(body, 'div')
+        assert select(body, 'DIV') == []
+
+        cache = XPathCache(maxsize=2)
+        xpath = cache.get('div')
+        assert cache.get('div') is xpath
+        cache.get('p')
+        cache.get('a')
+        assert cache.get('div') is not xpath
+        assert cache.info() == {'hits': 1, 'misses': 4, 'evictions': 2,
+                                'size': 2, 'maxsize': 2}
+
+        # Each thread compiles its own XPath objects
+        other = []
+        thread = threading.Thread(target=lambda: other.append(cache.get('a')))
+        thread.start()
+        thread.join()
+        assert other[0] is not cache.get('a')
+        assert cache.info()['hits'] == 2
+        cache.clear()
+        assert cache.info()['size'] == 0
+
+        namespaces = {'x': 'http://www.w3.org/1999/xhtml'}
+        xpath = cache.get('x|div', namespaces=namespaces)
+        assert cache.get('x|div', namespaces=dict(namespaces)) is xpath
+        self.assertRaises(SelectorSyntaxError, cache.get, 'div >')
+        self.assertRaises(ValueError, XPathCache, 0)
+
+    def test_select_unordered(self):
+        from cssselect.compiled import (
+            XPathCache, compile_xpath_list, select_unordered)
+
+        document = html.document_fromstring(HTML_SHAKESPEARE)
+        body = document.xpath('//body')[0]
+        css = 'div.dialog, div#speech1, div:hover, div.scene div.dialog'
+        expected = body.xpath(GenericTranslator().css_to_xpath(css))
+        results = select_unordered(body, css)
+        assert len(results) == sum(
+            len(body.xpath(GenericTranslator().css_to_xpath(selector)))
+            for selector in css.split(','))
+        assert len(set(results)) == len(expected) == 52
+        results = select_unordered(body, css, dedup=True)
+        assert len(results) == 52
+        assert set(results) == set(expected)
+        assert select_unordered(body, 'div:hover') == []
+
+        xpaths = compile_xpath_list(css)
+        assert len(xpaths) == 3
+        assert compile_xpath_list(css) is xpaths
+        cache = XPathCache()
+        assert cache.get_list('div') is not cache.get('div')
+        assert cache.get_list('div')[0](body) == cache.get('div')(body)
+        assert cache.get_list('a:hover') == []
+
+    def test_matching(self):
+        document = etree.fromstring(
+            '<a xmlns:n="urn:n"><b id="1"><c id="2"/><!-- --><c id="3"/></b>'
+            '<n:c id="4"/></a>')
+        b, c2, c3 = document[0], document[0][0], document[0][2]
+
+        def ids(elements):
+            return [element.get('id') for element in elements]
+
+        assert ids(select(document, 'b > c + c')) == ['3']
+        assert ids(select(b, 'b c')) == ['2', '3']
+        # Only elements in the sub-tree of the root are considered
+        assert ids(select(b, 'a c')) == []
+        assert ids(select(b, ':scope > c:first-child')) == ['2']
+        assert ids(select(c3, 'c ~ c')) == []
+
+        match = GenericMatcher().compile('b > c:last-child, b:scope')
+        assert match(c3) and not match(c2)
+        assert match(b, b) and not match(b)
+        assert GenericMatcher().compile('b:hover') is not match
+
+        matcher = GenericMatcher(namespaces={'n': 'urn:n'})
+        assert ids(matcher.select(document, 'n|c')) == ['4']
+        assert ids(matcher.select(document, 'c')) == ['2', '3']
+        assert matcher.compile('n|c') is matcher.compile('n|c')
+        self.assertRaises(ExpressionError, GenericMatcher().compile, 'n|c')
+        self.assertRaises(ExpressionError, matcher.compile, 'a::before')
+        self.assertRaises(ExpressionError, matcher.compile, ':foo')
+        self.assertRaises(ExpressionError, matcher.compile, '.b:first-of-type')
+        self.assertRaises(ExpressionError, matcher.compile, ':nth-child(foo)')
+        assert HTMLMatcher().select(document, 'B') == [b]
+        assert HTMLMatcher(xhtml=True).select(document, 'B') == []
+
+        # Comments are skipped by the ElementTree adapter too
+        document = ElementTree.fromstring(etree.tostring(document))
+        matcher = GenericMatcher(namespaces={'n': 'urn:n'},
+                                 adapter=ElementTreeAdapter(document))
+        assert ids(matcher.select(document, 'b > c + c')) == ['3']
+        assert ids(matcher.select(document, 'c:first-child')) == ['2']
+        assert ids(matcher.select(document, 'c:last-of-type')) == ['3']
+        assert ids(matcher.select(document, 'a > n|c:last-child')) == ['4']
+        assert ids(matcher.select(document[0], 'a c')) == []
+        # Other trees must be indexed first
+        other = ElementTree.fromstring('<a><c id="5"/><c id="6"/></a>')
+        self.assertRaises(ValueError, matcher.select, other, 'a > c')
+        self.assertRaises(ValueError, matcher.select, other[0], ':root')
+        matcher.adapter.index(other)
+        assert ids(matcher.select(other, 'a > c + c')) == ['6']
+        assert ids(matcher.select(document, 'b > c + c')) == ['3']
+        matcher.adapter.index(other[1])
+        assert ids(matcher.select(other[1], 'c:last-child:not(:root)')) == ['6']
+
+    def test_ancestor_filter(self):
+        ancestors = AncestorFilter(bits=4)
+        a, b = ancestors.positions('a'), ancestors.positions('b')
+        assert not ancestors.might_contain(a)
+        assert ancestors.might_contain(())
+        ancestors.add(a)
+        ancestors.add(a + b)
+        assert ancestors.might_contain(a + b)
+        ancestors.remove(a)
+        assert ancestors.might_contain(a)
+        ancestors.remove(a + b)
+        assert not ancestors.might_contain(a)
+        self.assertRaises(ValueError, AncestorFilter, 0)
+
+        def keys(css):
+            matcher = HTMLMatcher(namespaces={'n': 'urn:n'})
+            return matcher._ancestor_keys(parse(css)[0])
+        assert keys('.sidebar .widget a') == ['.widget', '.sidebar']
+        assert keys('DIV#main > p:not(.x):first-child span') == [
+            'p', '#main', 'div']
+        assert keys('a ~ b + c') == []
+        assert keys('a > b + c') == ['a']
+        assert keys('n|a *:nth-child(2) c') == ['{urn:n}a']
+
+        document = html.document_fromstring(
+            '<div class="sidebar"><p class="widget"><a id="1"></a></p>'
+            '<a id="2"></a></div><p class="widget"><a id="3"></a></p>')
+        matcher = HTMLMatcher()
+        matcher.ancestor_filter = True
+        assert [element.get('id') for element in matcher.select(
+            document, '.sidebar .widget a, p > #3')] == ['1', '3']
+
+    def test_selector_set(self):
+        document = html.document_fromstring(
+            '<div id="main" class="x y"><a href="#" class="y">1</a>'
+            '<input type="text"><p title="t">2</p></div>')
+        div, a, input_, p = document.xpath('//div | //div/*')
+        selectors = SelectorSet(HTMLMatcher())
+        selectors.add('div.y, #main > a, a:not(.z), a')
+        selectors.add('[title], [href!=foo], [type="text"], :hover, a')
+        assert len(selectors) == 8
+        assert [s.canonical() for s in selectors] == [
+            'div.y', '#main > a', 'a:not(.z)', 'a', '[title]',
+            '[href!=foo]', "[type='text']", ':hover']
+        assert sorted(selectors._classes) == ['y']
+        assert sorted(selectors._tags) == ['a']
+        assert sorted(selectors._attributes) == ['title', 'type']
+
+        def canonical(element):
+            return [s.canonical() for s in selectors.match(element)]
+        assert canonical(div) == ['div.y', '[href!=foo]']
+        assert canonical(a) == ['#main > a', 'a:not(.z)', 'a', '[href!=foo]']
+        assert canonical(input_) == ['[href!=foo]', "[type='text']"]
+        assert canonical(p) == ['[title]', '[href!=foo]']
+
+        self.assertRaises(KeyError, selectors.remove, 'a, b')
+        assert len(selectors) == 8
+        selectors.remove('#main > a, a, :hover, [type="text"]')
+        assert parse('a', immutable=True)[0] not in selectors
+        assert canonical(a) == ['a:not(.z)', '[href!=foo]']
+        assert canonical(input_) == ['[href!=foo]']
+        assert sorted(selectors._tags) == ['a']
+        assert sorted(selectors._attributes) == ['title']
+        assert selectors.select(document) == list(document.iter())
+        selectors.remove('[href!=foo]')
+        assert selectors.select(document) == [div, a, p]
+
+        self.assertRaises(ExpressionError, selectors.add, 'p, a::before')
+        assert len(selectors) == 3
+
+    def test_streaming(self):
+        source = (
+            b'<r xmlns:n="urn:n"><a id="1" class="x"><b id="2"/><!-- -->'
+            b'<b id="3" class="x y"><a id="4"/></b></a>'
+            b'<n:a id="5" n:x="z"><b id="6"/>text</n:a></r>')
+        document = etree.fromstring(source)
+        matcher = GenericMatcher(namespaces={'n': 'urn:n'})
+
+        def lxml_events():
+            return etree.iterparse(BytesIO(source), events=('start', 'end'))
+
+        def etree_events():
+            parser = ElementTree.XMLPullParser(
+                events=('start', 'end', 'comment', 'start-ns'))
+            parser.feed(source)
+            parser.close()
+            return parser.read_events()
+
+        event_sources = [lxml_events]
+        # New in Python 3.4
+        if hasattr(ElementTree, 'XMLPullParser'):
+            event_sources.append(etree_events)
+
+        def ids(elements):
+            return [element.get('id') for element in elements]
+
+        for css in ['b', 'a b', 'a > b', '.x', 'b:first-child', ':root',
+                    ':not(.x)', 'a .x a', 'r > :first-child', '*', 'n|a b',
+                    '[n|x^=z]', 'n|* > b', '#4, #5 > b, [class~=y]']:
+            expected = sorted(ids(matcher.select(document, css)), key=str)
+            for events in event_sources:
+                for clear in (True, False):
+                    elements = list(iterselect(
+                        events(), css, {'n': 'urn:n'}, clear))
+                    assert sorted(ids(elements), key=str) == expected
+
+        # Elements are returned complete, in the order they end
+        elements = list(iterselect(lxml_events(), 'a'))
+        assert ids(elements) == ['4', '1']
+        assert ids(elements[1].iter('*')) == ['1', '2', '3', '4']
+        # ... and then removed from their parent
+        assert elements[1].getparent() is None
+        events = lxml_events()
+        assert ids(iterselect(events, 'b')) == ['2', '3', '6']
+        assert len(events.root) == 0
+        events = lxml_events()
+        assert ids(iterselect(events, 'b', clear=False)) == ['2', '3', '6']
+        assert len(events.root) == 2
+        # The sub-tree of a matching element is kept
+        root, = iterselect(lxml_events(), ':root')
+        assert ids(root.iter('*')) == [None, '1', '2', '3', '4', '5', '6']
+        # Callers can remove elements themselves
+        for element in iterselect(lxml_events(), 'b'):
+            element.getparent().remove(element)
+
+        matcher = StreamMatcher()
+        for css in ['a + b', 'a ~ b', ':last-child', ':nth-child(2)',
+                    ':empty', ':contains(x)', ':not(:only-child)', ':scope',
+                    '::before', ':hover']:
+            self.assertRaises(ExpressionError, matcher.iterselect, [], css)
+        # iterparse() only gives 'end' events by default
+        elements = iterselect(etree.iterparse(BytesIO(source)), 'b')
+        self.assertRaises(ValueError, list, elements)
+
     def test_select_shakespeare(self):
         document = html.document_fromstring(HTML_SHAKESPEARE)
         body = document.xpath('//body')[0]
         css_to_xpath = GenericTranslator().css_to_xpath
+        match_select = GenericMatcher().select
 
         try:
             basestring_ = basestring
@@ -872,6 +1716,7 @@ class TestCssselect(unittest.TestCase):
         def count(selector):
             xpath = css_to_xpath(selector)
             results = body.xpath(xpath)
+            assert match_select(body, selector) == results
             assert not isinstance(results, basestring_)
             found = set()
             for item in results: